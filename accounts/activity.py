@@ -0,0 +1,199 @@
+"""
+Write-behind login activity. Login views only append a LoginEvent to an in-process buffer;
+a background flusher writes the buffer with one bulk INSERT and folds every successful
+login in it into a single UPDATE of users.last_login, once BATCH_SIZE events are waiting
+or FLUSH_INTERVAL after the first of them arrived. The buffer is bounded (events beyond
+MAX_BUFFER_SIZE are dropped and counted) and flushed at interpreter exit, so only a hard
+crash can lose what is still buffered.
+"""
+import atexit
+import ipaddress
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .metrics import LOGIN_EVENTS
+from .models import LoginEvent, User
+from .proxies import client_address
+from .profile_cache import invalidate_profiles
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ASYNC': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_BUFFER_SIZE': 10000,
+}
+
+
+def activity_setting(name):
+    return getattr(settings, 'LOGIN_ACTIVITY', {}).get(name, DEFAULTS[name])
+
+
+class LoginActivityRecorder:
+    """Bounded buffer of login events written in batches by a background flusher thread"""
+
+    def __init__(self, batch_size=None, flush_interval=None, maxsize=None):
+        self.batch_size = batch_size or activity_setting('BATCH_SIZE')
+        self.flush_interval = flush_interval if flush_interval is not None else activity_setting('FLUSH_INTERVAL')
+        self.maxsize = maxsize or activity_setting('MAX_BUFFER_SIZE')
+        self._events = []
+        self._ready = threading.Condition()
+        # one writer at a time, so a flush at exit waits for the batch the thread holds
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, event: LoginEvent):
+        """Buffer an event for the next flush, returns False if the buffer is full"""
+        self._ensure_started()
+        with self._ready:
+            if len(self._events) >= self.maxsize:
+                logger.warning("Login activity buffer full, dropping event for %s", event.email)
+                LOGIN_EVENTS.inc(result='dropped')
+                return False
+            self._events.append(event)
+            if len(self._events) >= self.batch_size:
+                self._ready.notify()
+        return True
+
+    def flush(self):
+        """Write everything currently buffered on the calling thread"""
+        with self._write_lock:
+            while True:
+                with self._ready:
+                    batch = self._events[:self.batch_size]
+                    del self._events[:self.batch_size]
+                if not batch:
+                    return
+                self._write(batch)
+
+    def pending(self):
+        return len(self._events)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='login-activity-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: self._events)
+                self._ready.wait_for(lambda: len(self._events) >= self.batch_size, timeout=self.flush_interval)
+            # the thread keeps its connection between flushes, like a request would
+            close_old_connections()
+            self.flush()
+
+    def _write(self, batch):
+        """One INSERT for the events and one UPDATE for every user that logged in"""
+        self._resolve_failed(batch)
+        latest = {}
+        for event in batch:
+            if event.outcome == LoginEvent.SUCCESS and event.user_id is not None:
+                latest[event.user_id] = max(latest.get(event.user_id, event.created_at), event.created_at)
+        try:
+            with transaction.atomic():
+                LoginEvent.objects.bulk_create(batch)
+                if latest:
+                    logged_in_at = Case(
+                        *[When(pk=user_id, then=Value(at)) for user_id, at in latest.items()],
+                        output_field=DateTimeField(),
+                    )
+                    # never move last_login backwards if a later login was already written
+                    User.objects.filter(pk__in=latest).update(
+                        last_login=Greatest(Coalesce(F('last_login'), logged_in_at), logged_in_at),
+                    )
+        except DatabaseError as e:
+            logger.error("Dropping %d login events: %s", len(batch), e)
+            LOGIN_EVENTS.inc(len(batch), result='dropped')
+            return False
+        LOGIN_EVENTS.inc(len(batch), result='written')
+        # update() skips post_save, so the cached profiles are dropped here
+        invalidate_profiles(latest)
+        return True
+
+
+    def _resolve_failed(self, batch):
+        # failed logins are recorded by email only, so the request doesn't look the account
+        # up; one SELECT per batch attaches it and tells apart the inactive ones, which the
+        # default backend refuses before checking the password
+        failed = [event for event in batch if event.outcome == LoginEvent.FAILED and event.user_id is None
+                  and event.email]
+        if not failed:
+            return
+        try:
+            accounts = {email: (pk, is_active) for email, pk, is_active in User.objects.filter(
+                email__in={event.email for event in failed}).values_list('email', 'pk', 'is_active')}
+        except DatabaseError as e:
+            logger.warning("Could not resolve the accounts of %d failed logins: %s", len(failed), e)
+            return
+        for event in failed:
+            if event.email in accounts:
+                event.user_id, is_active = accounts[event.email]
+                if not is_active:
+                    event.outcome = LoginEvent.INACTIVE
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_activity_recorder() -> LoginActivityRecorder:
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = LoginActivityRecorder()
+                atexit.register(_recorder.flush)
+    return _recorder
+
+
+def client_ip(request):
+    """The address throttling keys on, when it is a valid IP"""
+    try:
+        return str(ipaddress.ip_address(client_address(request)))
+    except ValueError:
+        return None
+
+
+def record_login(request, email, user, outcome):
+    """
+    Note a login attempt without touching the database; failed attempts pass no user and
+    are matched to their account when written. With LOGIN_ACTIVITY['ASYNC'] disabled the
+    event is written inline instead.
+    """
+    if not activity_setting('ENABLED'):
+        return
+    event = LoginEvent(
+        user_id=user.pk if user is not None else None,
+        email=User.objects.normalize_email(email)[:255] if isinstance(email, str) else '',
+        ip_address=client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+        outcome=outcome,
+        created_at=timezone.now(),
+    )
+    recorder = get_activity_recorder()
+    if not activity_setting('ASYNC'):
+        with recorder._write_lock:
+            recorder._write([event])
+        return
+    recorder.record(event)
+
+
+async def arecord_login(request, email, user, outcome):
+    if activity_setting('ASYNC'):
+        record_login(request, email, user, outcome)
+    else:
+        await sync_to_async(record_login)(request, email, user, outcome)
@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .metrics import install_query_recorder
+        connection_created.connect(install_query_recorder)
+
+        interval = getattr(settings, 'OTP_PURGE_INTERVAL', None)
+        if interval:
+            from .otp import start_otp_purge_scheduler
+            start_otp_purge_scheduler(
+                interval,
+                batch_size=getattr(settings, 'OTP_PURGE_BATCH_SIZE', 1000),
+            )
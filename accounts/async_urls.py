@@ -0,0 +1,15 @@
+from django.urls import path
+from . import async_views
+
+
+urlpatterns = [
+    path('login/', async_views.AsyncLoginView.as_view(), name='login'),
+    path('logout/', async_views.AsyncLogoutView.as_view(), name='logout'),
+    path('register/', async_views.AsyncRegisterView.as_view(), name='register'),
+    path('verify-email/', async_views.AsyncVerifyEmailView.as_view(), name='verify_email'),
+    path('password-reset/', async_views.AsyncSendOTPView.as_view(), name='password_reset'),
+    path('check-otp/', async_views.AsyncCheckOTPView.as_view(), name='check_otp'),
+    path('password-reset-confirm/', async_views.AsyncPasswordResetConfirmView.as_view(), name='password_reset_confirm'),
+    path('change-password/', async_views.AsyncChangePasswordView.as_view(), name='change_password'),
+    path('profile/', async_views.AsyncProfileView.as_view(), name='profile'),
+]
@@ -0,0 +1,272 @@
+"""
+Native async versions of the accounts endpoints, served at api/async/accounts/.
+Only simplejwt's outstanding/blacklisted token bookkeeping and the throttles, which use
+the sync cache API, still need a thread hop.
+"""
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from django.db import IntegrityError
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled, ValidationError
+from rest_framework.fields import empty
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.activity import arecord_login
+from accounts.authentication import JWTClaimsAuthentication, arevoke_user_tokens
+from accounts.models import LoginEvent, User
+from accounts.profile_cache import aget_cached_profile, etag_matches
+from accounts.realtime import EMAIL_VERIFIED, TOKEN_BLACKLISTED, apush
+from accounts.serializers import (
+    ChangePasswordSerializer,
+    CustomTokenObtainPairSerializer,
+    RegisterSerializer,
+    ResetPasswordConfirmSerializer,
+    UserSerializer,
+    VerifyEmailSerializer,
+)
+from accounts.throttling import LoginRateThrottle, OTPCheckRateThrottle, OTPSendRateThrottle, RegisterRateThrottle
+from accounts.tokens import CachedRefreshToken
+from accounts.utils import acheck_otp, asend_otp_email, ause_otp
+
+
+class AsyncRegisterSerializer(RegisterSerializer):
+    class Meta(RegisterSerializer.Meta):
+        # uniqueness is checked with the async ORM in the view instead
+        extra_kwargs = {'email': {'validators': []}}
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """Minimal async counterpart of GenericAPIView: JSON in/out and JWT auth"""
+
+    authentication_required = False
+    throttle_classes: list = []
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.data = self.parse_body(request)
+        except ValueError:
+            return JsonResponse({"detail": "JSON parse error"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles)(request)
+            if self.authentication_required:
+                result = await JWTClaimsAuthentication().aauthenticate(request)
+                if result is None:
+                    return JsonResponse({"detail": "Authentication credentials were not provided."},
+                                        status=status.HTTP_401_UNAUTHORIZED)
+                request.user, request.auth = result
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as e:
+            detail = e.detail if isinstance(e.detail, (dict, list)) else {"detail": e.detail}
+            response = JsonResponse(detail, status=e.status_code, safe=False)
+            if isinstance(e, Throttled) and e.wait is not None:
+                response['Retry-After'] = str(math.ceil(e.wait))
+            return response
+
+    def check_throttles(self, request):
+        # the counters are sync cache calls, a network round-trip on Redis, so dispatch runs
+        # this in a thread rather than on the event loop
+        waits = [throttle.wait() for throttle in (cls() for cls in self.throttle_classes)
+                 if not throttle.allow_request(request, self)]
+        if waits:
+            raise Throttled(wait=max(wait or 0 for wait in waits))
+
+    def parse_body(self, request):
+        if request.content_type == 'application/json':
+            return json.loads(request.body or b'{}')
+        return request.POST
+
+
+class AsyncLoginView(AsyncAPIView):
+    throttle_classes = [LoginRateThrottle]
+
+    async def post(self, request):
+        if not isinstance(request.data, dict):
+            return JsonResponse({"detail": "Expected an object"}, status=status.HTTP_400_BAD_REQUEST)
+        # the sync view's field validation, without its sync authenticate()
+        fields = CustomTokenObtainPairSerializer().fields
+        credentials, errors = {}, {}
+        for name in ('email', 'password'):
+            try:
+                credentials[name] = fields[name].run_validation(request.data.get(name, empty))
+            except ValidationError as e:
+                errors[name] = e.detail
+        if errors:
+            return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        email = credentials['email']
+        user = await aauthenticate(request, **credentials)
+        if user is None:
+            await arecord_login(request, email, None, LoginEvent.FAILED)
+            return JsonResponse({"detail": "No active account found with the given credentials"},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        # for_user() records an OutstandingToken row, which only has a sync API
+        refresh = await sync_to_async(CustomTokenObtainPairSerializer.get_token)(user)
+        await arecord_login(request, email, user, LoginEvent.SUCCESS)
+        return JsonResponse({"refresh": str(refresh), "access": str(refresh.access_token)})
+
+
+class AsyncRegisterView(AsyncAPIView):
+    throttle_classes = [RegisterRateThrottle]
+
+    async def post(self, request):
+        serializer = AsyncRegisterSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        if await User.objects.filter_by_email(data['email']).aexists():
+            return JsonResponse({"email": ["user with this email already exists."]},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            user = await User.objects.acreate_user(
+                email=data['email'],
+                password=data['password'],
+                full_name=data.get('full_name', ''),
+                is_active=False,
+            )
+        except IntegrityError:
+            # registered concurrently since the check above
+            return JsonResponse({"email": ["user with this email already exists."]},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        if await asend_otp_email(user):
+            return JsonResponse({"message": "Otp sent to your email"})
+        return JsonResponse({"error": "Otp sent failed"})
+
+
+class AsyncVerifyEmailView(AsyncAPIView):
+    throttle_classes = [OTPCheckRateThrottle]
+
+    async def post(self, request):
+        serializer = VerifyEmailSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data['email']
+
+        user = await User.objects.filter_by_email(email).afirst()
+        if not user:
+            return JsonResponse({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+        if user.is_active:
+            return JsonResponse({"message": f"Email {email} is already verified"})
+
+        if await ause_otp(user, serializer.validated_data['otp']):
+            user.is_active = True
+            await user.asave(update_fields=['is_active'])
+            await apush(user.pk, EMAIL_VERIFIED)
+            return JsonResponse({"message": f"Email {email} successfully verified"})
+        return JsonResponse({"error": "OTP is expired or already used"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncPasswordResetConfirmView(AsyncAPIView):
+    throttle_classes = [OTPCheckRateThrottle]
+
+    async def post(self, request):
+        serializer = ResetPasswordConfirmSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data['email']
+
+        user = await User.objects.filter_by_email(email).afirst()
+        if not user:
+            return JsonResponse({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if await ause_otp(user, serializer.validated_data['otp']):
+            await user.aset_password(serializer.validated_data['new_password'])
+            await user.asave(update_fields=['password'])
+            await arevoke_user_tokens(user)
+            return JsonResponse({"message": f"Password for {email} successfully reset"})
+        return JsonResponse({"error": "OTP is expired or already used"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncSendOTPView(AsyncAPIView):
+    throttle_classes = [OTPSendRateThrottle]
+
+    async def post(self, request):
+        email = request.data.get('email')
+        if not email:
+            return JsonResponse({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = await User.objects.filter_by_email(email).afirst()
+        if not user:
+            return JsonResponse({"error": "User with this email does not exist"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if await asend_otp_email(user):
+            return JsonResponse({"message": "OTP sent to your email"})
+        return JsonResponse({"error": "Failed to send OTP"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncCheckOTPView(AsyncAPIView):
+    throttle_classes = [OTPCheckRateThrottle]
+
+    async def post(self, request):
+        email = request.data.get('email')
+        otp = request.data.get('otp')
+        if not email or not otp:
+            return JsonResponse({"error": "Email and OTP are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = await User.objects.filter_by_email(email).afirst()
+        if not user:
+            return JsonResponse({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if await acheck_otp(user, otp):
+            return JsonResponse({"message": "OTP is valid"})
+        return JsonResponse({"error": "OTP is invalid or expired"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncProfileView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request):
+        profile = await aget_cached_profile(request.user, UserSerializer)
+        etag = profile['etag']
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse(profile['data'])
+        response['ETag'] = etag
+        return response
+
+
+class AsyncChangePasswordView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request):
+        serializer = ChangePasswordSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user = await request.user.aload()
+        if not await user.acheck_password(serializer.validated_data['old_password']):
+            return JsonResponse({"error": "Old password is incorrect"}, status=status.HTTP_400_BAD_REQUEST)
+
+        await user.aset_password(serializer.validated_data['new_password'])
+        await user.asave(update_fields=['password'])
+        await arevoke_user_tokens(user)
+        return JsonResponse({"message": "Password changed successfully"})
+
+
+class AsyncLogoutView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request):
+        refresh_token = request.data.get('refresh_token')
+        if not refresh_token:
+            return JsonResponse({"error": "Refresh token is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # the blacklist check in the constructor and simplejwt's blacklist tables are sync only
+            token = await sync_to_async(CachedRefreshToken)(refresh_token)
+            await sync_to_async(token.blacklist)()
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        await apush(request.user.pk, TOKEN_BLACKLISTED, jti=token[api_settings.JTI_CLAIM])
+        return JsonResponse({"message": "Successfully logged out"}, status=status.HTTP_205_RESET_CONTENT)
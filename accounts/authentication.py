@@ -0,0 +1,194 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .metrics import CacheStats
+from .realtime import TOKENS_REVOKED, apush, push
+from .sessions import is_jwt_only
+
+# Profile claims copied into every token so hot views can run without loading the user
+TOKEN_CLAIMS = ('email', 'is_active', 'is_staff', 'token_version')
+
+
+token_version_cache_stats = CacheStats('token_version')
+
+
+def _token_version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Current token version of an active user (None otherwise), served from cache after the first lookup"""
+    key = _token_version_key(user_id)
+    version = cache.get(key)
+    if version is not None:
+        token_version_cache_stats.hit()
+    else:
+        token_version_cache_stats.miss()
+        User = get_user_model()
+        version = User.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        # add() so a revoke that stored its newer version meanwhile isn't overwritten
+        cache.add(key, version, timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    return version
+
+
+async def aget_token_version(user_id):
+    key = _token_version_key(user_id)
+    version = await cache.aget(key)
+    if version is not None:
+        token_version_cache_stats.hit()
+    else:
+        token_version_cache_stats.miss()
+        User = get_user_model()
+        version = await User.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).afirst()
+        if version is None:
+            return None
+        await cache.aadd(key, version, timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    return version
+
+
+def forget_token_version(user_id):
+    cache.delete(_token_version_key(user_id))
+
+
+def revoke_user_tokens(user):
+    """Bump the user's token version so every token issued before now is rejected"""
+    User = get_user_model()
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    version = User.objects.filter(pk=user.pk).values_list('token_version', flat=True).get()
+    cache.set(_token_version_key(user.pk), version,
+              timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    push(user.pk, TOKENS_REVOKED, token_version=version)
+    return version
+
+
+async def arevoke_user_tokens(user):
+    User = get_user_model()
+    await User.objects.filter(pk=user.pk).aupdate(token_version=F('token_version') + 1)
+    version = await User.objects.filter(pk=user.pk).values_list('token_version', flat=True).aget()
+    await cache.aset(_token_version_key(user.pk), version,
+                     timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    await apush(user.pk, TOKENS_REVOKED, token_version=version)
+    return version
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    User backed by the token claims. Claim attributes are answered from the token,
+    anything else loads the real User row once and proxies to it.
+    """
+
+    def __init__(self, validated_token):
+        User = get_user_model()
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        self.__dict__['_token'] = validated_token
+        self.__dict__['_claims'] = {
+            'pk': user_id,
+            'id': user_id,
+            'is_authenticated': True,
+            'is_anonymous': False,
+            **{claim: validated_token[claim] for claim in TOKEN_CLAIMS},
+        }
+        super().__init__(lambda: User.objects.get(pk=user_id))
+
+    def __getattr__(self, name):
+        claims = self.__dict__['_claims']
+        if self._wrapped is empty and name in claims:
+            return claims[name]
+        return super().__getattr__(name)
+
+    async def aload(self):
+        """Load the real User without the sync ORM call the lazy proxy would make"""
+        if self._wrapped is empty:
+            self._wrapped = await get_user_model().objects.aget(pk=self.pk)
+        return self._wrapped
+
+    # answered here rather than proxied, so truth tests and hashing don't load the row
+    def __bool__(self):
+        return True
+
+    def __hash__(self):
+        return hash(self.__dict__['_claims']['pk'])
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            return type(self)(self.__dict__['_token'])
+        return super().__copy__()
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            result = type(self)(self.__dict__['_token'])
+            memo[id(self)] = result
+            return result
+        return super().__deepcopy__(memo)
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the profile claims in the access token instead of
+    fetching the user on every request. Tokens issued before the claims were added
+    fall back to the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if any(claim not in validated_token for claim in TOKEN_CLAIMS):
+            return super().get_user(validated_token)
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        current_version = get_token_version(validated_token[api_settings.USER_ID_CLAIM])
+        if current_version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if validated_token['token_version'] != current_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        return ClaimsUser(validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, without thread hops on the claims path"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if any(claim not in validated_token for claim in TOKEN_CLAIMS):
+            return await sync_to_async(super().get_user)(validated_token)
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        current_version = await aget_token_version(validated_token[api_settings.USER_ID_CLAIM])
+        if current_version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if validated_token['token_version'] != current_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        return ClaimsUser(validated_token)
+
+
+class RouteAwareSessionAuthentication(SessionAuthentication):
+    """SessionAuthentication for the browsable API, skipped on JWT-only paths (accounts.sessions)"""
+
+    def authenticate(self, request):
+        if is_jwt_only(request._request.path_info):
+            return None
+        return super().authenticate(request)
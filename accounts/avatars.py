@@ -0,0 +1,236 @@
+"""
+Avatar pipeline: size-limited streaming uploads, thumbnails generated off the request
+on a small worker pool, and presigned direct-to-bucket uploads when the avatar storage
+is S3-compatible.
+"""
+import io
+import logging
+import posixpath
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import close_old_connections, transaction
+
+from accounts.models import User
+from accounts.profile_cache import invalidate_profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'STORAGE': 'default',
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,
+    'MAX_PIXELS': 40_000_000,
+    'ALLOWED_FORMATS': ('JPEG', 'PNG', 'WEBP', 'GIF'),
+    'SIZES': (64, 256),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 82,
+    'ASYNC': True,
+    'WORKERS': 2,
+    'PRESIGNED_EXPIRY': 600,
+}
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+def avatar_setting(name):
+    return getattr(settings, 'AVATARS', {}).get(name, DEFAULTS[name])
+
+
+def get_avatar_storage():
+    return storages[avatar_setting('STORAGE')]
+
+
+class InvalidAvatar(Exception):
+    pass
+
+
+class AvatarUploadHandler(FileUploadHandler):
+    """
+    First handler in the chain: counts bytes as they stream in and stops reading the
+    request as soon as the upload goes over MAX_UPLOAD_SIZE, instead of after spooling it.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or avatar_setting('MAX_UPLOAD_SIZE')
+        self.received = 0
+        self.exceeded = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # the multipart envelope adds a little on top of the file itself
+        if content_length and content_length > self.max_size + 64 * 1024:
+            self.exceeded = True
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.exceeded or self.received > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def validate_avatar(file):
+    """Check the header of an uploaded image without decoding the pixels"""
+    # Pillow is imported on first use: it is a sizeable share of worker start-up time
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(file) as image:
+            image_format, width, height = image.format, image.width, image.height
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise InvalidAvatar("Upload a valid image")
+    finally:
+        file.seek(0)
+    if image_format not in avatar_setting('ALLOWED_FORMATS'):
+        raise InvalidAvatar(f"Unsupported image format {image_format}")
+    if width * height > avatar_setting('MAX_PIXELS'):
+        raise InvalidAvatar("Image dimensions are too large")
+
+
+def _render(image, size, fmt):
+    from PIL import Image, ImageOps
+
+    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    if fmt == 'jpeg':
+        thumbnail.convert('RGB').save(out, 'JPEG', quality=avatar_setting('QUALITY'), optimize=True, progressive=True)
+    else:
+        thumbnail.save(out, 'WEBP', quality=avatar_setting('QUALITY'), method=4)
+    return out.getvalue()
+
+
+def generate_thumbnails(name):
+    """Render every configured size and format of the stored avatar `name`, returns {size: {fmt: name}}"""
+    from PIL import Image, ImageOps
+
+    storage = get_avatar_storage()
+    with storage.open(name) as f, Image.open(f) as image:
+        if image.width * image.height > avatar_setting('MAX_PIXELS'):
+            raise InvalidAvatar("Image dimensions are too large")
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        stem = posixpath.splitext(name)[0]
+        thumbnails = {}
+        for size in avatar_setting('SIZES'):
+            for fmt in avatar_setting('FORMATS'):
+                thumb_name = storage.save(f'{stem}_{size}.{fmt}', ContentFile(_render(image, size, fmt)))
+                thumbnails.setdefault(str(size), {})[fmt] = thumb_name
+    return thumbnails
+
+
+def delete_avatar_files(name, thumbnails):
+    storage = get_avatar_storage()
+    for file_name in [name, *(n for formats in (thumbnails or {}).values() for n in formats.values())]:
+        if file_name:
+            try:
+                storage.delete(file_name)
+            except Exception:
+                logger.warning("Could not delete avatar file %s", file_name, exc_info=True)
+
+
+def process_avatar(user_id, name):
+    """Generate thumbnails and attach them, unless the user replaced the avatar meanwhile"""
+    try:
+        thumbnails = generate_thumbnails(name)
+    except Exception:
+        logger.exception("Avatar processing failed for %s", name)
+        return
+    if User.objects.filter(pk=user_id, avatar=name).update(avatar_thumbnails=thumbnails):
+        invalidate_profile(user_id)
+    else:
+        delete_avatar_files(None, thumbnails)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_avatar_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=avatar_setting('WORKERS'), thread_name_prefix='avatar')
+    return _executor
+
+
+def _process_in_worker(user_id, name):
+    close_old_connections()
+    try:
+        process_avatar(user_id, name)
+    finally:
+        close_old_connections()
+
+
+def schedule_avatar_processing(user_id, name):
+    """Process the avatar after the current transaction commits, on the worker pool unless AVATARS['ASYNC'] is off"""
+    if avatar_setting('ASYNC'):
+        transaction.on_commit(lambda: get_avatar_executor().submit(_process_in_worker, user_id, name))
+    else:
+        transaction.on_commit(lambda: process_avatar(user_id, name))
+
+
+def set_avatar(user, name):
+    """Point the user at a newly stored original, drop the old files and queue thumbnailing"""
+    previous, previous_thumbnails = user.avatar.name, user.avatar_thumbnails
+    user.avatar.name = name
+    user.avatar_thumbnails = {}
+    user.save(update_fields=['avatar', 'avatar_thumbnails'])
+    if previous and previous != name:
+        transaction.on_commit(lambda: delete_avatar_files(previous, previous_thumbnails))
+    schedule_avatar_processing(user.pk, name)
+
+
+def store_avatar(user, file):
+    validate_avatar(file)
+    extension = posixpath.splitext(file.name or '')[1].lower()[:8]
+    name = get_avatar_storage().save(f'avatars/{user.pk}/{uuid.uuid4().hex}{extension}', file)
+    set_avatar(user, name)
+    return name
+
+
+def _direct_upload_prefix(user):
+    return f'avatars/{user.pk}/direct/'
+
+
+def presigned_avatar_upload(user, content_type):
+    """
+    Presigned POST letting the client upload straight to the bucket, or None when the
+    avatar storage isn't S3-compatible. Size and content type are enforced by S3 itself.
+    """
+    storage = get_avatar_storage()
+    if getattr(storage, 'bucket', None) is None:
+        return None
+    name = f'{_direct_upload_prefix(user)}{uuid.uuid4().hex}'
+    key = storage._normalize_name(name)  # prepends the storage's location
+    post = storage.bucket.meta.client.generate_presigned_post(
+        Bucket=storage.bucket.name,
+        Key=key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, avatar_setting('MAX_UPLOAD_SIZE')],
+        ],
+        ExpiresIn=avatar_setting('PRESIGNED_EXPIRY'),
+    )
+    return {'url': post['url'], 'fields': post['fields'], 'name': name}
+
+
+def complete_direct_upload(user, name):
+    """Adopt an object uploaded with presigned_avatar_upload() as the user's avatar"""
+    storage = get_avatar_storage()
+    if not name.startswith(_direct_upload_prefix(user)) or '..' in name or not storage.exists(name):
+        raise InvalidAvatar("Unknown upload")
+    with storage.open(name) as f:
+        validate_avatar(f)
+    set_avatar(user, name)
@@ -0,0 +1,237 @@
+"""
+Content-negotiated compression. Responses are compressed with the best encoding the client
+accepts (zstd, br when the brotli package is installed, gzip) once they reach MIN_SIZE, and
+streaming responses such as the user export are compressed chunk by chunk. Request bodies
+sent with `Content-Encoding: zstd` or `gzip` are decompressed before anything reads them.
+"""
+import gzip
+import io
+import re
+import zlib
+
+import zstandard
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    # server preference, used to break ties between equally weighted client choices
+    'ENCODINGS': ('zstd', 'br', 'gzip'),
+    'MIN_SIZE': 1024,
+    'LEVELS': {'zstd': 3, 'br': 4, 'gzip': 6},
+    'CONTENT_TYPES': (
+        'application/json', 'application/msgpack', 'application/x-ndjson', 'application/javascript',
+        'image/svg+xml', 'text/',
+    ),
+    # decompressed request bodies larger than this are rejected; None uses DATA_UPLOAD_MAX_MEMORY_SIZE
+    'MAX_REQUEST_SIZE': None,
+}
+
+ACCEPT_ENCODING = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)')
+
+
+def compression_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+def _level(name):
+    return {**DEFAULTS['LEVELS'], **compression_setting('LEVELS')}[name]
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def compress(self, data):
+        # mtime=0 keeps the output, and so any cache keyed on it, deterministic
+        return gzip.compress(data, compresslevel=_level('gzip'), mtime=0)
+
+    def compressor(self):
+        return zlib.compressobj(_level('gzip'), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def reader(self, fileobj):
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=_level('zstd')).compress(data)
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=_level('zstd')).compressobj()
+
+    def reader(self, fileobj):
+        return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def compress(self, data):
+        return brotli.compress(data, quality=_level('br'))
+
+    def compressor(self):
+        return _BrotliCompressor(brotli.Compressor(quality=_level('br')))
+
+
+class _BrotliCompressor:
+    """Gives brotli.Compressor the compress()/flush() interface of the other codecs"""
+
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+CODECS = {'zstd': ZstdCodec(), 'gzip': GzipCodec()}
+if brotli is not None:
+    CODECS['br'] = BrotliCodec()
+# brotli can't bound the size of what it decompresses, so it is accepted for responses only
+REQUEST_CODECS = {'zstd': CODECS['zstd'], 'gzip': CODECS['gzip']}
+
+
+def negotiate_encoding(accept_encoding):
+    """The codec to use for an Accept-Encoding header, or None to send the response as is"""
+    weights = {}
+    for name, q in ACCEPT_ENCODING.findall(accept_encoding or ''):
+        try:
+            weights[name.lower()] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    preference = [name for name in compression_setting('ENCODINGS') if name in CODECS]
+    wildcard = weights.get('*', 0.0)
+    candidates = [(weights.get(name, wildcard), -index, name) for index, name in enumerate(preference)]
+    candidates = [candidate for candidate in candidates if candidate[0] > 0]
+    return CODECS[max(candidates)[2]] if candidates else None
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return any(content_type.startswith(prefix) for prefix in compression_setting('CONTENT_TYPES'))
+
+
+def compress_chunks(codec, chunks):
+    compressor = codec.compressor()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def acompress_chunks(codec, chunks):
+    compressor = codec.compressor()
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def decompress_request(request):
+    """
+    Replace a compressed request body with its decompressed bytes. Returns an error
+    response when the encoding is unsupported, the body is corrupt or it inflates past
+    MAX_REQUEST_SIZE, None otherwise.
+    """
+    encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    if not encoding or encoding == 'identity':
+        return None
+    codec = REQUEST_CODECS.get(encoding)
+    if codec is None:
+        return JsonResponse({"error": f"Unsupported Content-Encoding {encoding}"}, status=415)
+
+    limit = compression_setting('MAX_REQUEST_SIZE') or settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    try:
+        with codec.reader(io.BytesIO(request.body)) as reader:
+            # read one byte past the limit to tell "exactly at" from "over" without inflating the rest
+            body = reader.read(limit + 1) if limit else reader.read()
+    except (OSError, EOFError, zlib.error, zstandard.ZstdError):
+        return JsonResponse({"error": "Could not decompress the request body"}, status=400)
+    if limit and len(body) > limit:
+        return JsonResponse({"error": f"Decompressed request body exceeds {limit} bytes"}, status=413)
+
+    request._body = body
+    request._stream = io.BytesIO(body)
+    request.META['CONTENT_LENGTH'] = str(len(body))
+    del request.META['HTTP_CONTENT_ENCODING']
+    request.__dict__.pop('headers', None)
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Sits just inside MetricsMiddleware, ahead of everything that reads the request body
+    or sets response headers, so it sees the final response.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = compression_setting('ENABLED')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        error = decompress_request(request)
+        if error is not None:
+            return error
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        error = decompress_request(request)
+        if error is not None:
+            return error
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_chunks(codec, response.streaming_content)
+            else:
+                response.streaming_content = compress_chunks(codec, response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < compression_setting('MIN_SIZE'):
+                return response
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # the bytes on the wire changed, so the validator can only be a weak one now
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
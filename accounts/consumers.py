@@ -0,0 +1,65 @@
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.exceptions import APIException
+
+from .authentication import JWTClaimsAuthentication
+from .realtime import TOKENS_REVOKED, user_group
+
+# application close codes: the client should log in again before reconnecting
+CLOSE_UNAUTHORIZED = 4001
+CLOSE_TOKEN_EXPIRED = 4002
+
+
+class UserEventsConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes the accounts.realtime events of the authenticated user. The access token goes
+    in an `Authorization: Bearer` header or, for browsers, the `token` query parameter.
+    Bearer tokens aren't ambient credentials, so no Origin check is needed. The socket is
+    closed when the token expires or is revoked.
+    """
+
+    async def connect(self):
+        try:
+            self.user, self.token = await self.authenticate()
+        except APIException:
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+        self.group = user_group(self.user.pk)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+        self.expiry = asyncio.get_running_loop().call_later(
+            max(0, self.token['exp'] - time.time()),
+            lambda: asyncio.ensure_future(self.close(code=CLOSE_TOKEN_EXPIRED)),
+        )
+
+    async def authenticate(self):
+        auth = JWTClaimsAuthentication()
+        raw_token = None
+        header = dict(self.scope['headers']).get(b'authorization')
+        if header is not None:
+            raw_token = auth.get_raw_token(header)
+        if raw_token is None:
+            raw_token = parse_qs(self.scope['query_string'].decode()).get('token', [None])[0]
+        if raw_token is None:
+            raise APIException('Authentication credentials were not provided.')
+        validated_token = auth.get_validated_token(raw_token)
+        return await auth.aget_user(validated_token), validated_token
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            self.expiry.cancel()
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # the stream only goes one way; anything the client sends is ignored
+        pass
+
+    async def user_event(self, message):
+        await self.send_json({'type': message['event'], **message['data']})
+        if message['event'] == TOKENS_REVOKED:
+            version = message['data'].get('token_version')
+            if version is None or self.token.get('token_version', -1) < version:
+                await self.close(code=CLOSE_UNAUTHORIZED)
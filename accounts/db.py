@@ -0,0 +1,23 @@
+import time
+
+
+def chunked_delete(queryset, batch_size=1000, sleep=0.0):
+    """
+    Delete the rows of `queryset` in primary-key ordered chunks so no single
+    statement holds locks for long. Yields the number of rows removed per chunk,
+    cascades included.
+    """
+    model = queryset.model
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(chunk.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        deleted, _ = model._base_manager.filter(pk__in=pks).delete()
+        last_pk = pks[-1]
+        yield deleted
+        if len(pks) < batch_size:
+            return
+        if sleep:
+            time.sleep(sleep)
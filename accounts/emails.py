@@ -0,0 +1,41 @@
+import time
+
+from accounts.models import User
+
+
+def canonicalize_emails(batch_size=1000, sleep=0.0):
+    """
+    Rewrite stored emails into their canonical form (UserManager.normalize_email) in
+    primary-key ordered chunks, bulk updating each. Yields `(updated, conflicts)` per chunk,
+    where conflicts are the emails left alone because another account already holds
+    their canonical spelling; those accounts need merging by hand.
+    """
+    last_pk = None
+    while True:
+        chunk = User.objects.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', 'email')[:batch_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+
+        changes = {pk: User.objects.normalize_email(email) for pk, email in rows
+                   if email != User.objects.normalize_email(email)}
+        taken = set(User.objects.filter(email__in=changes.values()).values_list('email', flat=True))
+        updates, conflicts = [], []
+        for pk, email in rows:
+            if pk not in changes:
+                continue
+            if changes[pk] in taken:
+                conflicts.append(email)
+                continue
+            taken.add(changes[pk])
+            updates.append(User(pk=pk, email=changes[pk]))
+        User.objects.bulk_update(updates, ['email'])
+        yield len(updates), conflicts
+
+        if len(rows) < batch_size:
+            return
+        if sleep:
+            time.sleep(sleep)
@@ -0,0 +1,44 @@
+import django_filters
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from accounts.models import User
+
+
+def prefix_q(alias, term):
+    """
+    Case-insensitive prefix match on a Lower() alias, written as a range so any
+    btree index on Lower(field) can seek to it. The startswith recheck drops rows
+    that only fall in the range because of collation rules.
+    """
+    term = term.lower()
+    q = Q(**{f'{alias}__gte': term, f'{alias}__startswith': term})
+    # the last code point has no successor; the prefix before trailing ones bounds the range too
+    stem = term.rstrip('\U0010ffff')
+    if stem:
+        q &= Q(**{f'{alias}__lt': stem[:-1] + chr(ord(stem[-1]) + 1)})
+    return q
+
+
+class UserFilter(django_filters.FilterSet):
+    joined_after = django_filters.IsoDateTimeFilter(field_name='joined_at', lookup_expr='gte')
+    joined_before = django_filters.IsoDateTimeFilter(field_name='joined_at', lookup_expr='lt')
+    email = django_filters.CharFilter(method='filter_email')
+    name = django_filters.CharFilter(method='filter_name')
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = User
+        fields = ['is_active', 'is_staff']
+
+    def filter_email(self, queryset, name, value):
+        return queryset.alias(email_lower=Lower('email')).filter(prefix_q('email_lower', value))
+
+    def filter_name(self, queryset, name, value):
+        return queryset.alias(full_name_lower=Lower('full_name')).filter(prefix_q('full_name_lower', value))
+
+    def filter_search(self, queryset, name, value):
+        return queryset.alias(
+            email_lower=Lower('email'),
+            full_name_lower=Lower('full_name'),
+        ).filter(prefix_q('email_lower', value) | prefix_q('full_name_lower', value))
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .metrics import HASHING_TIME, timed
+
+DEFAULTS = {
+    'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': hashers.ScryptPasswordHasher.work_factor,
+    'ARGON2_TIME_COST': hashers.Argon2PasswordHasher.time_cost,
+    'ARGON2_MEMORY_COST': hashers.Argon2PasswordHasher.memory_cost,
+    'ARGON2_PARALLELISM': hashers.Argon2PasswordHasher.parallelism,
+    'WORKERS': None,
+    'MAX_PENDING': 256,
+}
+
+
+def hashing_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count taken from settings"""
+
+    def __init__(self):
+        self.iterations = hashing_setting('PBKDF2_ITERATIONS')
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """Scrypt with the work factor taken from settings"""
+
+    def __init__(self):
+        self.work_factor = hashing_setting('SCRYPT_WORK_FACTOR')
+        # OpenSSL refuses more than 32MB by default, which n > 2**14 needs
+        self.maxmem = 2 * 128 * self.block_size * self.work_factor * self.parallelism
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id with costs taken from settings, requires argon2-cffi"""
+
+    def __init__(self):
+        self.time_cost = hashing_setting('ARGON2_TIME_COST')
+        self.memory_cost = hashing_setting('ARGON2_MEMORY_COST')
+        self.parallelism = hashing_setting('ARGON2_PARALLELISM')
+
+
+class HashingPool:
+    """
+    Bounded pool for password hashing. Hashers release the GIL, so a thread per core
+    gives real parallelism while capping how many hashes run at once, and async
+    callers can await the work instead of blocking the event loop.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or hashing_setting('WORKERS') or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending or hashing_setting('MAX_PENDING'))
+
+    def submit(self, fn, *args):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn, *args):
+        # acquiring a slot may block, so do it off the event loop
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(None, self.submit, fn, *args)
+        return await asyncio.wrap_future(future)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool() -> HashingPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool()
+    return _pool
+
+
+def make_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    with timed('hash', HASHING_TIME, operation='make'):
+        return get_hashing_pool().run(hashers.make_password, raw_password)
+
+
+async def amake_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    with timed('hash', HASHING_TIME, operation='make'):
+        return await get_hashing_pool().arun(hashers.make_password, raw_password)
+
+
+def check_password(raw_password, encoded, setter=None):
+    """
+    Like django.contrib.auth.hashers.check_password with the hash comparison on the pool.
+    The setter (the rehash-and-save on an outdated hash) runs on the calling thread so it
+    uses the caller's database connection and transaction.
+    """
+    with timed('hash', HASHING_TIME, operation='check'):
+        is_correct, must_update = get_hashing_pool().run(hashers.verify_password, raw_password, encoded)
+    if setter and is_correct and must_update:
+        setter(raw_password)
+    return is_correct
+
+
+async def acheck_password(raw_password, encoded, setter=None):
+    with timed('hash', HASHING_TIME, operation='check'):
+        is_correct, must_update = await get_hashing_pool().arun(hashers.verify_password, raw_password, encoded)
+    if setter and is_correct and must_update:
+        await setter(raw_password)
+    return is_correct
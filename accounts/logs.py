@@ -0,0 +1,22 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+# attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RESERVED)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,150 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from .metrics import EMAIL_DISPATCH, current_request_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'BATCH_SIZE': 50,
+    'MAX_QUEUE_SIZE': 10000,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 1.0,
+    'POLL_INTERVAL': 0.5,
+}
+
+
+def mail_queue_setting(name):
+    return getattr(settings, 'MAIL_QUEUE', {}).get(name, DEFAULTS[name])
+
+
+class MailQueue:
+    """Outbound mail queue drained in batches by a background dispatcher thread"""
+
+    def __init__(self, batch_size=None, max_retries=None, retry_backoff=None,
+                 poll_interval=None, maxsize=None):
+        self.batch_size = batch_size or mail_queue_setting('BATCH_SIZE')
+        self.max_retries = max_retries if max_retries is not None else mail_queue_setting('MAX_RETRIES')
+        self.retry_backoff = retry_backoff if retry_backoff is not None else mail_queue_setting('RETRY_BACKOFF')
+        self.poll_interval = poll_interval or mail_queue_setting('POLL_INTERVAL')
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize or mail_queue_setting('MAX_QUEUE_SIZE'))
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, message: EmailMessage):
+        """Queue a message for delivery, returns False if the queue is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            logger.warning("Mail queue full, dropping message to %s", message.to)
+            return False
+        return True
+
+    def flush(self):
+        """Deliver everything currently queued on the calling thread"""
+        while True:
+            batch = self._take_batch(timeout=None)
+            if not batch:
+                return
+            self._dispatch(batch)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mail-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(timeout=self.poll_interval)
+            if batch:
+                self._dispatch(batch)
+
+    def _take_batch(self, timeout):
+        batch = []
+        try:
+            if timeout is None:
+                batch.append(self._queue.get_nowait())
+            else:
+                batch.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, batch, max_retries=None):
+        """Send a batch over a single connection, backing off between failed attempts"""
+        started = time.perf_counter()
+        sent = self._send(batch, self.max_retries if max_retries is None else max_retries)
+        elapsed = time.perf_counter() - started
+        EMAIL_DISPATCH.observe(elapsed, result='sent' if sent else 'failed')
+        current = current_request_metrics()
+        if current is not None:
+            # only when sending inline; queued mail is dispatched outside any request
+            current.timings['mail'] += elapsed
+        return sent
+
+    def _send(self, batch, max_retries):
+        # messages go one at a time so a retry only resends the ones not yet delivered
+        pending = list(batch)
+        for attempt in range(max_retries + 1):
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+                while pending:
+                    connection.send_messages(pending[:1])
+                    pending.pop(0)
+                return True
+            except Exception as e:
+                if attempt == max_retries:
+                    logger.error("Dropping %d queued emails after %d attempts: %s", len(pending), attempt + 1, e)
+                    return False
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning("Email batch failed (%s), retrying %d emails in %.1fs", e, len(pending), delay)
+                time.sleep(delay)
+            finally:
+                connection.close()
+        return False
+
+
+_mail_queue = None
+_mail_queue_lock = threading.Lock()
+
+
+def get_mail_queue() -> MailQueue:
+    global _mail_queue
+    if _mail_queue is None:
+        with _mail_queue_lock:
+            if _mail_queue is None:
+                _mail_queue = MailQueue()
+                atexit.register(_mail_queue.flush)
+    return _mail_queue
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """
+    Drop-in for send_mail that returns immediately and leaves SMTP to the dispatcher.
+    With MAIL_QUEUE['ASYNC'] disabled the message is sent inline instead.
+    """
+    email = EmailMessage(subject, message, from_email, recipient_list)
+    if not mail_queue_setting('ASYNC'):
+        # a single attempt: the request shouldn't sit out the retry backoff
+        return get_mail_queue()._dispatch([email], max_retries=0)
+    return get_mail_queue().enqueue(email)
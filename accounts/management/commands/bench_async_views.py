@@ -0,0 +1,119 @@
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+ENDPOINTS = {
+    'profile': ('get', 'profile/', None),
+    'check-otp': ('post', 'check-otp/', {'otp': '0000'}),
+}
+
+
+class ThreadSampler:
+    """Track the peak number of live threads while a run is in progress"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = "Compare the sync (WSGI / ASGI thread hop) and native async accounts views in-process"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='profile')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(email=f'bench-{uuid.uuid4().hex}@example.invalid', password=None)
+        try:
+            token = CustomTokenObtainPairSerializer.get_token(user).access_token
+            method, path, body = ENDPOINTS[options['endpoint']]
+            if body is not None:
+                body = {**body, 'email': user.email}
+            request = {'method': method, 'path': path, 'body': body, 'auth': f'Bearer {token}'}
+
+            self.stdout.write(f"{options['requests']} requests, concurrency {options['concurrency']}, "
+                              f"endpoint {options['endpoint']}")
+            for mode, runner in (
+                ('wsgi (sync views, thread pool)', self.run_wsgi),
+                ('asgi (sync views, thread hop)', self.run_asgi_sync),
+                ('asgi (native async views)', self.run_asgi_async),
+            ):
+                with ThreadSampler() as sampler:
+                    started = time.perf_counter()
+                    latencies = runner(request, options['requests'], options['concurrency'])
+                    elapsed = time.perf_counter() - started
+                self.report(mode, latencies, elapsed, sampler.peak)
+        finally:
+            user.delete()
+
+    def report(self, mode, latencies, elapsed, peak_threads):
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"  {mode:34} {len(latencies) / elapsed:8.0f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:6.2f}ms  p99 {p99 * 1000:6.2f}ms  "
+            f"peak threads {peak_threads}"
+        )
+
+    def run_wsgi(self, request, total, concurrency):
+        local = threading.local()
+
+        def call(_):
+            client = getattr(local, 'client', None) or Client()
+            local.client = client
+            started = time.perf_counter()
+            getattr(client, request['method'])(
+                f"/api/accounts/{request['path']}", request['body'],
+                content_type='application/json', HTTP_AUTHORIZATION=request['auth'],
+            )
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(call, range(total)))
+
+    def run_asgi_sync(self, request, total, concurrency):
+        return asyncio.run(self._run_async(request, f"/api/accounts/{request['path']}", total, concurrency))
+
+    def run_asgi_async(self, request, total, concurrency):
+        return asyncio.run(self._run_async(request, f"/api/async/accounts/{request['path']}", total, concurrency))
+
+    async def _run_async(self, request, url, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                await getattr(client, request['method'])(
+                    url, request['body'], content_type='application/json',
+                    headers={'Authorization': request['auth']},
+                )
+                return time.perf_counter() - started
+
+        return list(await asyncio.gather(*(call() for _ in range(total))))
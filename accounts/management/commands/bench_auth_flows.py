@@ -0,0 +1,250 @@
+import json
+import re
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import OTP, User
+from accounts.provisioning import import_users
+
+FLOW = ('register', 'verify-email', 'login', 'token/refresh', 'profile', 'logout')
+PASSWORD = 'bench-Pass-4821'
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class InProcessTransport:
+    """Drives the app through the Django test client, with the mail going to locmem"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, data=None, token=None):
+        client = getattr(self.local, 'client', None) or Client()
+        self.local.client = client
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        response = getattr(client, method)(f'/api/accounts/{path}', data, content_type='application/json', **headers)
+        body = response.json() if response.get('Content-Type', '').startswith('application/json') else {}
+        return response.status_code, body, response.get('Server-Timing', '')
+
+    def otp_for(self, email):
+        for message in reversed(getattr(mail, 'outbox', [])):
+            if email in message.to:
+                return re.search(r'(\d{4,6})\s*$', message.body).group(1)
+        return None
+
+
+class HTTPTransport:
+    """
+    Drives a running server. It must share this process's database and store OTPs there
+    (DatabaseOTPBackend), and run with EMAIL_BACKEND=locmem, EMAIL_HOST_USER/PASSWORD
+    set and the THROTTLE_RATE_* variables raised.
+    """
+
+    def __init__(self, base_url):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, path, data=None, token=None):
+        session = getattr(self.local, 'session', None) or self.requests.Session()
+        self.local.session = session
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        kwargs = {'params': data} if method == 'get' else {'json': data}
+        response = session.request(method, f'{self.base_url}/api/accounts/{path}', headers=headers, **kwargs)
+        body = response.json() if response.headers.get('Content-Type', '').startswith('application/json') else {}
+        return response.status_code, body, response.headers.get('Server-Timing', '')
+
+    def otp_for(self, email):
+        return (OTP.objects.filter(user__email=email, is_used=False)
+                .order_by('-created_at').values_list('code', flat=True).first())
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, elapsed, status_code, timing, expected):
+        match = QUERIES.search(timing)
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if match:
+                self.queries[endpoint].append(int(match.group(1)))
+            if status_code not in expected:
+                self.errors[endpoint] += 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Seed users and drive register -> verify -> login -> refresh -> profile -> logout flows "
+            "at a given concurrency, reporting per-endpoint latency, throughput and queries per request")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Users seeded before the run")
+        parser.add_argument('--flows', type=int, default=200, help="Complete flows to run")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--base-url', help="Run against this server instead of in-process")
+        parser.add_argument('--output', help="Where to write the JSON results (default bench-results/)")
+        parser.add_argument('--compare', help="Earlier JSON results to diff against")
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help="Fail when an endpoint's p95 grows by more than this fraction vs --compare")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded and registered users")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        if options['base_url']:
+            transport = HTTPTransport(options['base_url'])
+            results = self.run(transport, run_id, options)
+        else:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                EMAIL_HOST_USER='bench', EMAIL_HOST_PASSWORD='bench',
+                MAIL_QUEUE={**getattr(settings, 'MAIL_QUEUE', {}), 'ASYNC': False},
+                REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': dict.fromkeys(
+                    settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), '1000000/s')},
+            ):
+                mail.outbox = []
+                results = self.run(InProcessTransport(), run_id, options)
+
+        self.report(results)
+        output = Path(options['output'] or f"bench-results/{results['started_at'][:19].replace(':', '')}"
+                                           f"-{results['commit'] or 'nocommit'}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(f"Results written to {output}")
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), results, options['max_regression'])
+
+    def run(self, transport, run_id, options):
+        seeded = import_users(
+            ({'email': f'seed-{run_id}-{i}@bench.invalid', 'password': PASSWORD} for i in range(options['users'])),
+            processes=False,
+        ).created
+        recorder = Recorder()
+
+        def flow(i):
+            try:
+                self.flow(transport, recorder, f'flow-{run_id}-{i}@bench.invalid')
+            finally:
+                close_old_connections()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                list(executor.map(flow, range(options['flows'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            if not options['keep']:
+                User.objects.filter(
+                    Q(email__startswith=f'seed-{run_id}-') | Q(email__startswith=f'flow-{run_id}-')
+                ).delete()
+
+        return {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': self.commit(),
+            'target': options['base_url'] or 'in-process',
+            'database': connection.vendor,
+            'seeded_users': seeded,
+            'flows': options['flows'],
+            'concurrency': options['concurrency'],
+            'elapsed': elapsed,
+            'flows_per_second': options['flows'] / elapsed if elapsed else 0.0,
+            'endpoints': {
+                endpoint: {
+                    'requests': len(recorder.latencies[endpoint]),
+                    'errors': recorder.errors[endpoint],
+                    'throughput': len(recorder.latencies[endpoint]) / elapsed if elapsed else 0.0,
+                    'p50_ms': percentile(recorder.latencies[endpoint], 50) * 1000,
+                    'p95_ms': percentile(recorder.latencies[endpoint], 95) * 1000,
+                    'p99_ms': percentile(recorder.latencies[endpoint], 99) * 1000,
+                    'queries_per_request': (statistics.fmean(recorder.queries[endpoint])
+                                            if recorder.queries[endpoint] else None),
+                }
+                for endpoint in FLOW if recorder.latencies[endpoint]
+            },
+        }
+
+    def flow(self, transport, recorder, email):
+        def call(endpoint, method, data=None, token=None, expected=(200,)):
+            started = time.perf_counter()
+            status_code, body, timing = transport.request(method, f'{endpoint}/', data, token)
+            recorder.record(endpoint, time.perf_counter() - started, status_code, timing, expected)
+            return status_code in expected, body
+
+        ok, _ = call('register', 'post', {'email': email, 'password': PASSWORD, 'full_name': 'Bench'})
+        otp = transport.otp_for(email) if ok else None
+        if not otp:
+            return
+        ok, _ = call('verify-email', 'post', {'email': email, 'otp': otp})
+        if not ok:
+            return
+        ok, tokens = call('login', 'post', {'email': email, 'password': PASSWORD})
+        if not ok:
+            return
+        ok, refreshed = call('token/refresh', 'post', {'refresh': tokens['refresh']})
+        if not ok:
+            return
+        access = refreshed['access']
+        call('profile', 'get', token=access)
+        call('logout', 'post', {'refresh_token': refreshed.get('refresh', tokens['refresh'])},
+             token=access, expected=(205,))
+
+    def commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, results):
+        self.stdout.write(
+            f"{results['flows']} flows, concurrency {results['concurrency']}, {results['seeded_users']} seeded users, "
+            f"{results['target']} on {results['database']}: {results['flows_per_second']:.1f} flows/s"
+        )
+        for endpoint, stats in results['endpoints'].items():
+            queries = stats['queries_per_request']
+            self.stdout.write(
+                f"  {endpoint:14} {stats['throughput']:8.1f} req/s  p50 {stats['p50_ms']:7.2f}ms  "
+                f"p95 {stats['p95_ms']:7.2f}ms  p99 {stats['p99_ms']:7.2f}ms  "
+                f"queries {'-' if queries is None else f'{queries:.1f}':>5}  errors {stats['errors']}"
+            )
+
+    def compare(self, before, after, max_regression):
+        self.stdout.write(f"Compared with {before.get('commit') or 'earlier run'}:")
+        regressions = []
+        for endpoint, stats in after['endpoints'].items():
+            old = before.get('endpoints', {}).get(endpoint)
+            if not old:
+                continue
+            change = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0.0
+            queries = ''
+            if stats['queries_per_request'] is not None and old.get('queries_per_request') is not None:
+                queries = f"  queries {old['queries_per_request']:.1f} -> {stats['queries_per_request']:.1f}"
+            self.stdout.write(f"  {endpoint:14} p95 {old['p95_ms']:7.2f} -> {stats['p95_ms']:7.2f}ms "
+                              f"({change:+.0%}){queries}")
+            if max_regression is not None and change > max_regression:
+                regressions.append(endpoint)
+        if regressions:
+            raise CommandError(f"p95 regressed by more than {max_regression:.0%} on: {', '.join(regressions)}")
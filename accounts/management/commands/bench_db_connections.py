@@ -0,0 +1,65 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = "Measure per-request database connection overhead with and without persistent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--conn-max-age', type=int, default=600,
+                            help="CONN_MAX_AGE compared against 0 (default 600)")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        admin = User.objects.create_user(email=f'bench-{uuid.uuid4().hex}@example.invalid', password=None,
+                                         is_staff=True)
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            token = CustomTokenObtainPairSerializer.get_token(admin).access_token
+            self.stdout.write(f"{options['requests']} requests to users/ on {connection.vendor} "
+                              f"({connection.settings_dict['ENGINE']})")
+            for max_age in (0, options['conn_max_age']):
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                connection.close()
+                opened, latencies = self.run(connection, f'Bearer {token}', options['requests'])
+                self.stdout.write(
+                    f"  CONN_MAX_AGE={max_age:<5} {opened:5} connections opened  "
+                    f"mean {statistics.fmean(latencies) * 1000:6.2f}ms  "
+                    f"p50 {statistics.median(latencies) * 1000:6.2f}ms"
+                )
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = configured
+            connection.close()
+            admin.delete()
+
+    def run(self, connection, auth, total):
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        client = Client()
+        latencies = []
+        connection_created.connect(count)
+        try:
+            for _ in range(total):
+                started = time.perf_counter()
+                # the test client skips the handler's connection housekeeping, so do it here
+                close_old_connections()
+                client.get('/api/accounts/users/', {'page_size': 10}, HTTP_AUTHORIZATION=auth)
+                close_old_connections()
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection_created.disconnect(count)
+        return sum(alias == connection.alias for alias in opened), latencies
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import resource
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import TOKEN_CLAIMS
+from accounts.models import User
+from accounts.provisioning import import_users
+from accounts.realtime import PROFILE_CHANGED, apush
+from project_name.asgi import application
+
+from .bench_auth_flows import percentile
+
+
+def access_token_for(user):
+    # the claims CustomTokenObtainPairSerializer adds, without writing an outstanding refresh token
+    token = AccessToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return str(token)
+
+
+class Command(BaseCommand):
+    help = ("Hold many concurrent connections to the account events WebSocket, driven in-process "
+            "through the ASGI application and the configured channel layer, and report connect "
+            "latency, memory per connection and how long one push per user takes to reach them all")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100, help="Users the connections are spread over")
+        parser.add_argument('--concurrency', type=int, default=100, help="Connections opened at once")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Seconds to wait for a connect or an event")
+        parser.add_argument('--output', help="Also write the results as JSON here")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded users")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        import_users({'email': f'ws-{run_id}-{i}@bench.invalid'} for i in range(options['users']))
+        users = User.objects.filter(email__startswith=f'ws-{run_id}-')
+        try:
+            tokens = {user.pk: access_token_for(user) for user in users}
+            results = async_to_sync(self.run)(tokens, options)
+        finally:
+            if not options['keep']:
+                users.delete()
+
+        self.report(results)
+        if options['output']:
+            output = Path(options['output'])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {output}")
+
+    async def run(self, tokens, options):
+        user_ids = list(tokens)
+        timeout = options['timeout']
+        connected, connect_times = [], []
+
+        async def open_connection(i):
+            user_id = user_ids[i % len(user_ids)]
+            communicator = WebsocketCommunicator(application, f'/ws/accounts/events/?token={tokens[user_id]}')
+            started = time.perf_counter()
+            accepted, _ = await communicator.connect(timeout=timeout)
+            connect_times.append(time.perf_counter() - started)
+            if accepted:
+                connected.append(communicator)
+
+        # ru_maxrss is the peak, in KiB on Linux; good enough for the growth while connecting
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        for start in range(0, options['connections'], options['concurrency']):
+            stop = min(start + options['concurrency'], options['connections'])
+            await asyncio.gather(*(open_connection(i) for i in range(start, stop)))
+        connect_elapsed = time.perf_counter() - started
+        rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+
+        async def receive(communicator):
+            await communicator.receive_json_from(timeout=timeout)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        receiving = [asyncio.ensure_future(receive(communicator)) for communicator in connected]
+        for user_id in user_ids:
+            await apush(user_id, PROFILE_CHANGED)
+        deliveries = [result for result in await asyncio.gather(*receiving, return_exceptions=True)
+                      if not isinstance(result, BaseException)]
+
+        await asyncio.gather(*(communicator.disconnect() for communicator in connected))
+
+        return {
+            'connections': options['connections'],
+            'users': len(user_ids),
+            'concurrency': options['concurrency'],
+            'connected': len(connected),
+            'connects_per_second': len(connected) / connect_elapsed if connect_elapsed else 0.0,
+            'connect_p50_ms': percentile(connect_times, 50) * 1000,
+            'connect_p95_ms': percentile(connect_times, 95) * 1000,
+            'connect_p99_ms': percentile(connect_times, 99) * 1000,
+            'bytes_per_connection': rss_growth / len(connected) if connected else None,
+            'delivered': len(deliveries),
+            'delivery_p50_ms': percentile(deliveries, 50) * 1000 if deliveries else None,
+            'delivery_p99_ms': percentile(deliveries, 99) * 1000 if deliveries else None,
+            'delivery_max_ms': max(deliveries) * 1000 if deliveries else None,
+        }
+
+    def report(self, results):
+        per_connection = results['bytes_per_connection']
+        self.stdout.write(
+            f"{results['connected']}/{results['connections']} connections over {results['users']} users, "
+            f"{results['concurrency']} at a time: {results['connects_per_second']:.0f} connects/s, "
+            f"p50 {results['connect_p50_ms']:.2f}ms  p95 {results['connect_p95_ms']:.2f}ms  "
+            f"p99 {results['connect_p99_ms']:.2f}ms, "
+            f"~{'-' if per_connection is None else f'{per_connection / 1024:.1f}'} KiB per connection"
+        )
+        if results['delivered']:
+            self.stdout.write(
+                f"One push per user reached {results['delivered']}/{results['connected']} connections: "
+                f"p50 {results['delivery_p50_ms']:.2f}ms  p99 {results['delivery_p99_ms']:.2f}ms  "
+                f"max {results['delivery_max_ms']:.2f}ms"
+            )
+        else:
+            self.stdout.write("No pushed event was delivered")
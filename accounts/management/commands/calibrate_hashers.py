@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import hashers
+
+
+def _time_hash(hasher, samples):
+    best = float('inf')
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.encode('calibration-password', hasher.salt())
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Find password hasher costs that take about --target-ms per hash on this machine"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=['pbkdf2_sha256', 'scrypt', 'argon2'], default='pbkdf2_sha256')
+        parser.add_argument('--target-ms', type=float, default=250.0)
+        parser.add_argument('--samples', type=int, default=3)
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        calibrate = getattr(self, f"calibrate_{options['algorithm']}")
+        settings_line, elapsed = calibrate(target, options['samples'])
+        self.stdout.write(f"{options['algorithm']}: {elapsed * 1000:.0f}ms per hash")
+        self.stdout.write(self.style.SUCCESS(settings_line))
+
+    def calibrate_pbkdf2_sha256(self, target, samples):
+        # cost is linear in iterations, so scale from one measurement
+        hasher = hashers.PBKDF2PasswordHasher()
+        hasher.iterations = 100_000
+        per_iteration = _time_hash(hasher, samples) / hasher.iterations
+        hasher.iterations = max(100_000, int(round(target / per_iteration, -4)))
+        return f"PBKDF2_ITERATIONS={hasher.iterations}", _time_hash(hasher, samples)
+
+    def calibrate_scrypt(self, target, samples):
+        # work factor must be a power of two, double until the target is reached
+        hasher = hashers.ScryptPasswordHasher()
+        work_factor = 2 ** 12
+        while True:
+            hasher.work_factor = work_factor
+            hasher.maxmem = 2 * 128 * hasher.block_size * work_factor * hasher.parallelism
+            elapsed = _time_hash(hasher, samples)
+            if elapsed >= target or work_factor >= 2 ** 20:
+                return f"SCRYPT_WORK_FACTOR={work_factor}", elapsed
+            work_factor *= 2
+
+    def calibrate_argon2(self, target, samples):
+        hasher = hashers.Argon2PasswordHasher()
+        try:
+            hasher._load_library()
+        except ValueError as e:
+            raise CommandError(str(e))
+        time_cost = 1
+        while True:
+            hasher.time_cost = time_cost
+            elapsed = _time_hash(hasher, samples)
+            if elapsed >= target or time_cost >= 20:
+                return f"ARGON2_TIME_COST={time_cost}", elapsed
+            time_cost += 1
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.emails import canonicalize_emails
+
+
+class Command(BaseCommand):
+    help = ("Lowercase stored emails in bounded primary-key chunks, reporting addresses that collide "
+            "with an existing account. Run it before applying the users_email_lower_uniq constraint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Users read and updated per chunk (default 1000)")
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="Seconds to pause between chunks")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total, conflicts = 0, []
+        for updated, chunk_conflicts in canonicalize_emails(batch_size=options['batch_size'], sleep=options['sleep']):
+            total += updated
+            conflicts.extend(chunk_conflicts)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  updated {updated} (total {total})")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Canonicalized {total} emails in {elapsed:.2f}s"))
+        if conflicts:
+            self.stdout.write(self.style.WARNING(
+                f"{len(conflicts)} emails collide with another account and were left as they are:"
+            ))
+            for email in conflicts:
+                self.stdout.write(f"  {email}")
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.otp import purgeable_otps, purge_otps
+
+
+class Command(BaseCommand):
+    help = "Delete used and expired OTPs in bounded primary-key chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows deleted per statement (default 1000)")
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="Seconds to pause between chunks")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only count the rows that would be deleted")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = purgeable_otps().count()
+            self.stdout.write(f"{count} OTPs would be purged")
+            return
+
+        started = time.monotonic()
+        total = 0
+        for deleted in purge_otps(batch_size=options['batch_size'], sleep=options['sleep']):
+            total += deleted
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  deleted {deleted} (total {total})")
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {total} OTPs in {elapsed:.2f}s ({rate:.0f} rows/sec)"
+        ))
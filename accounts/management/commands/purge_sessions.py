@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.sessions import purge_sessions, purgeable_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in bounded primary-key chunks (clearsessions without the single big DELETE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Sessions deleted per statement (default 1000)")
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="Seconds to pause between chunks")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only count the sessions that would be deleted")
+
+    def handle(self, *args, **options):
+        queryset = purgeable_sessions()
+        if queryset is None:
+            self.stdout.write(f"{settings.SESSION_ENGINE} expires sessions by itself, nothing to purge")
+            return
+        if options['dry_run']:
+            self.stdout.write(f"{queryset.count()} expired sessions would be purged")
+            return
+
+        started = time.monotonic()
+        total = 0
+        for deleted in purge_sessions(batch_size=options['batch_size'], sleep=options['sleep']):
+            total += deleted
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  deleted {deleted} (total {total})")
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {total} expired sessions in {elapsed:.2f}s ({rate:.0f} rows/sec)"
+        ))
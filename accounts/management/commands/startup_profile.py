@@ -0,0 +1,85 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def parse_import_times(stderr):
+    """`python -X importtime` output as (module, self_us, cumulative_us, depth) tuples"""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ("Start the project in a fresh interpreter and report per-module import time, each app's "
+            "ready() cost, URLconf and middleware loading, and first vs second request latency, "
+            "with and without the warm-up the preloading WSGI entry point does")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/accounts/profile/', help="Path requested after start-up")
+        parser.add_argument('--top', type=int, default=15, help="Number of modules and packages listed")
+        parser.add_argument('--json', action='store_true', help="Print the raw results as JSON")
+
+    def handle(self, *args, **options):
+        results = {mode: self.profile(options['path'], preload=mode == 'preload') for mode in ('cold', 'preload')}
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.report(results['cold'], options['top'])
+        self.compare(results)
+
+    def profile(self, path, preload):
+        command = [sys.executable, '-X', 'importtime', '-m', 'accounts.startup', path]
+        if preload:
+            command.append('--preload')
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        process = subprocess.run(command, capture_output=True, text=True, cwd=settings.BASE_DIR, env=env)
+        if process.returncode:
+            raise CommandError(f"Start-up failed:\n{process.stderr[-4000:]}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result['imports'] = parse_import_times(process.stderr)
+        return result
+
+    def report(self, result, top):
+        imports = result['imports']
+        self.stdout.write(f"{len(imports)} modules imported in {sum(m[1] for m in imports) / 1000:.1f}ms")
+
+        packages = defaultdict(int)
+        for name, self_us, _cumulative, _depth in imports:
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write("Import time by top-level package:")
+        for package, total in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"  {package:32} {total / 1000:8.1f}ms")
+
+        self.stdout.write("Slowest modules (including what they import):")
+        for name, _self_us, cumulative, _depth in sorted(imports, key=lambda m: -m[2])[:top]:
+            self.stdout.write(f"  {name:48} {cumulative / 1000:8.1f}ms")
+
+        self.stdout.write("Start-up phases:")
+        for phase, seconds in result['phases'].items():
+            self.stdout.write(f"  {phase:32} {seconds * 1000:8.1f}ms")
+        self.stdout.write("AppConfig.ready():")
+        for label, seconds in sorted(result['ready'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {label:32} {seconds * 1000:8.1f}ms")
+
+    def compare(self, results):
+        self.stdout.write("Requests:")
+        for mode, result in results.items():
+            self.stdout.write(
+                f"  {mode:8} first {result['first_request'] * 1000:8.1f}ms  "
+                f"second {result['second_request'] * 1000:8.1f}ms  status {result['status']}"
+            )
+        for step, seconds in results['preload']['warm_up'].items():
+            self.stdout.write(f"  warm_up {step:24} {seconds * 1000:8.1f}ms (before fork)")
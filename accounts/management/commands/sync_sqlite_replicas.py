@@ -0,0 +1,28 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary into the SQLite replica files, standing in for replication locally"
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("The primary database is not SQLite")
+        replicas = [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ())
+                    if connections[alias].vendor == 'sqlite']
+        if not replicas:
+            raise CommandError("No SQLite replicas configured, set SQLITE_REPLICAS")
+
+        primary.ensure_connection()
+        for alias in replicas:
+            connections[alias].close()
+            target = sqlite3.connect(str(connections[alias].settings_dict['NAME']))
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Synced {alias}"))
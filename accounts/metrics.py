@@ -0,0 +1,322 @@
+"""
+Small in-process metrics registry with Prometheus text exposition, plus the per-request
+bookkeeping behind MetricsMiddleware and the Server-Timing header. Each worker process
+keeps its own registry, so every process must be scraped on its own.
+"""
+import bisect
+import hmac
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .proxies import client_address
+
+logger = logging.getLogger('accounts.requests')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'TOKEN': None,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def metrics_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = ''
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in items]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (the last slot is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by route',
+                            ('view', 'method', 'status'))
+DB_QUERIES = Counter('db_queries_total', 'Database queries by route', ('view',))
+DB_TIME = Counter('db_query_seconds_total', 'Time spent in database queries by route', ('view',))
+CACHE_LOOKUPS = Counter('cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result'))
+HASHING_TIME = Histogram('password_hashing_seconds', 'Password hashing time, pool wait included',
+                         ('operation',))
+EMAIL_DISPATCH = Histogram('email_dispatch_seconds', 'Time to hand a batch of emails to the mail server',
+                           ('result',))
+LOGIN_EVENTS = Counter('login_events_total', 'Login events by what became of them', ('result',))
+
+
+class RequestMetrics:
+    """What one request spent, collected from whichever threads it ran on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+        self.cache = defaultdict(int)
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar('request_metrics', default=None)
+
+
+def current_request_metrics():
+    return _current.get()
+
+
+@contextmanager
+def request_metrics():
+    current = RequestMetrics()
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name, histogram=None, **labels):
+    """Time the block into `histogram` and the current request's Server-Timing entry `name`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+        current = _current.get()
+        if current is not None:
+            current.timings[name] += elapsed
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for this process, also exported as cache_lookups_total"""
+
+    def __init__(self, name='default', per_request=True):
+        self.name = name
+        # whether lookups also count towards the Server-Timing cache entry of the current request
+        self.per_request = per_request
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+        self._record('hit')
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+        self._record('miss')
+
+    def _record(self, result):
+        CACHE_LOOKUPS.inc(cache=self.name, result=result)
+        current = _current.get() if self.per_request else None
+        if current is not None:
+            current.cache[result] += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper, counts queries against the current request"""
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.db_queries += 1
+        current.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver; a wrapper on the connection sees queries from every code path"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def server_timing(current, total):
+    entries = [f'app;dur={total * 1000:.1f}',
+               f'db;dur={current.db_time * 1000:.1f};desc="{current.db_queries} queries"']
+    entries.extend(f'{name};dur={elapsed * 1000:.1f}' for name, elapsed in current.timings.items())
+    if current.cache:
+        entries.append(f'cache;desc="{current.cache["hit"]} hit {current.cache["miss"]} miss"')
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Outermost middleware: per-route latency, query count and time, and a Server-Timing
+    header breaking the request down into db, hashing, mail and cache activity.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics_setting('ENABLED')
+        self.server_timing = metrics_setting('SERVER_TIMING')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        with request_metrics() as current:
+            response = self.get_response(request)
+        return self.finish(request, response, current)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        with request_metrics() as current:
+            response = await self.get_response(request)
+        return self.finish(request, response, current)
+
+    def finish(self, request, response, current):
+        total = time.perf_counter() - current.started
+        match = getattr(request, 'resolver_match', None)
+        # the route pattern, not the path, keeps label cardinality bounded
+        view = match.route if match is not None else 'unmatched'
+        REQUEST_LATENCY.observe(total, view=view, method=request.method, status=response.status_code)
+        if current.db_queries:
+            DB_QUERIES.inc(current.db_queries, view=view)
+            DB_TIME.inc(current.db_time, view=view)
+        if self.server_timing:
+            response['Server-Timing'] = server_timing(current, total)
+        logger.debug(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={'view': view, 'status': response.status_code, 'duration_ms': round(total * 1000, 2),
+                   'db_queries': current.db_queries, 'db_ms': round(current.db_time * 1000, 2)},
+        )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, guarded by METRICS['TOKEN'] or else METRICS['ALLOWED_IPS']"""
+    token = metrics_setting('TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponseForbidden()
+    elif client_address(request) not in metrics_setting('ALLOWED_IPS'):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
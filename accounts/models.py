@@ -1,10 +1,33 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.db.models.functions import Lower
 import uuid
 from django.utils import timezone
+from . import hashers
 
 
 class UserManager(BaseUserManager):
+    @classmethod
+    def normalize_email(cls, email):
+        """The whole address lowercased, so every mailbox has exactly one stored spelling"""
+        return (email or '').strip().lower()
+
+    def filter_by_email(self, email):
+        """
+        The one lookup by address for views, serializers and the login backend: the input is
+        canonicalized and compared for equality, a single seek on the unique email index.
+        Anything but a string (e.g. from a malformed JSON body) matches nobody.
+        """
+        if not isinstance(email, str):
+            return self.none()
+        return self.filter(email=self.normalize_email(email))
+
+    def get_by_natural_key(self, username):
+        return self.filter_by_email(username).get()
+
+    async def aget_by_natural_key(self, username):
+        return await self.filter_by_email(username).aget()
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('Email must be provided')
@@ -13,6 +36,15 @@ class UserManager(BaseUserManager):
         user.set_password(password)
         user.save(using=self._db)
         return user
+
+    async def acreate_user(self, email, password=None, **extra_fields):
+        if not email:
+            raise ValueError('Email must be provided')
+        email = self.normalize_email(email)
+        user = self.model(email=email, **extra_fields)
+        await user.aset_password(password)
+        await user.asave(using=self._db)
+        return user
     
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
@@ -29,6 +61,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(max_length=20, blank=True, null=True)
 
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # {size: {format: storage name}} filled in by accounts.avatars once the upload is processed
+    avatar_thumbnails = models.JSONField(default=dict, blank=True)
     gender = models.CharField(max_length=20, blank=True, null=True,
                               choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')])
     age = models.IntegerField(blank=True, null=True)
@@ -39,6 +73,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # bumped to invalidate every outstanding JWT for the user (see accounts.authentication)
+    token_version = models.PositiveIntegerField(default=0)
     
     objects = UserManager()
 
@@ -47,10 +83,80 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         db_table = 'users'
+        indexes = [
+            models.Index(fields=['joined_at', 'id'], name='users_joined_at_id_idx'),
+            models.Index(Lower('full_name'), name='users_full_name_lower_idx'),
+        ]
+        constraints = [
+            # emails are stored canonical (UserManager.normalize_email); this also keeps writes
+            # that bypass the manager from adding a second spelling of an address. Run
+            # `manage.py canonicalize_emails` on existing data before applying it.
+            models.UniqueConstraint(Lower('email'), name='users_email_lower_uniq'),
+        ]
 
     def __str__(self):
         return self.email
 
+    # forms (the admin included) and direct saves store the same spelling as the manager
+    def clean(self):
+        super().clean()
+        self.email = self.__class__.objects.normalize_email(self.email)
+
+    def save(self, *args, **kwargs):
+        self.email = self.__class__.objects.normalize_email(self.email)
+        # token_version only moves through revoke_user_tokens(); a full save of an instance
+        # loaded before a revoke must not write the old version back
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'token_version'
+                                       and field.attname not in deferred]
+        super().save(*args, **kwargs)
+
+    # what token validity and the token claims depend on (see accounts.signals)
+    PRIVILEGE_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_privileges = instance.privileges()
+        return instance
+
+    def privileges(self):
+        """The privilege fields loaded on this instance, deferred ones left out"""
+        return {name: self.__dict__[name] for name in self.PRIVILEGE_FIELDS if name in self.__dict__}
+
+    async def aload(self):
+        """Counterpart of ClaimsUser.aload() so async views can treat both alike"""
+        return self
+
+    # Hashing runs on the bounded pool in accounts.hashers rather than inline
+    def set_password(self, raw_password):
+        self.password = hashers.make_password(raw_password)
+        self._password = raw_password
+
+    async def aset_password(self, raw_password):
+        self.password = await hashers.amake_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes.
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return hashers.check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        async def setter(raw_password):
+            await self.aset_password(raw_password)
+            self._password = None
+            await self.asave(update_fields=["password"])
+
+        return await hashers.acheck_password(raw_password, self.password, setter)
+
 
 class OTP(models.Model):
     """OTP for authentication purposes"""
@@ -64,6 +170,10 @@ class OTP(models.Model):
         db_table = 'otps'
         verbose_name = 'OTP'
         verbose_name_plural = 'OTPs'
+        indexes = [
+            models.Index(fields=['user', 'code', 'is_used', 'expires_at'], name='otps_lookup_idx'),
+            models.Index(fields=['expires_at'], name='otps_expires_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.code}"
@@ -73,3 +183,31 @@ class OTP(models.Model):
         return not self.is_used and timezone.now() < self.expires_at
 
 
+
+
+class LoginEvent(models.Model):
+    """One login attempt; written in batches by accounts.activity, never on the request path"""
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    INACTIVE = 'inactive'
+
+    # no database constraint: an event may be flushed after its user is deleted
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_events',
+                             blank=True, null=True, db_constraint=False)
+    email = models.CharField(max_length=255, blank=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    outcome = models.CharField(max_length=10, choices=[
+        (SUCCESS, 'Success'), (FAILED, 'Failed'), (INACTIVE, 'Inactive account'),
+    ])
+    # when the attempt happened, not when its batch was written
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'login_events'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='login_events_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} - {self.outcome}"
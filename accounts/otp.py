@@ -0,0 +1,171 @@
+import logging
+import threading
+from datetime import timedelta
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.db import chunked_delete
+from accounts.models import OTP
+
+logger = logging.getLogger(__name__)
+
+
+def get_otp_lifetime() -> timedelta:
+    return getattr(settings, 'OTP_LIFETIME', timedelta(minutes=10))
+
+
+class BaseOTPBackend:
+    """Stores issued OTPs and verifies/consumes them"""
+
+    def create(self, user, code):
+        raise NotImplementedError
+
+    def create_many(self, pairs):
+        """Store several `(user, code)` OTPs at once"""
+        for user, code in pairs:
+            self.create(user, code)
+
+    def check(self, user, code) -> bool:
+        raise NotImplementedError
+
+    def consume(self, user, code) -> bool:
+        raise NotImplementedError
+
+    async def acreate(self, user, code):
+        return await sync_to_async(self.create)(user, code)
+
+    async def acheck(self, user, code) -> bool:
+        return await sync_to_async(self.check)(user, code)
+
+    async def aconsume(self, user, code) -> bool:
+        return await sync_to_async(self.consume)(user, code)
+
+
+class DatabaseOTPBackend(BaseOTPBackend):
+    """OTPs stored in the otps table, looked up through the composite lookup index"""
+
+    def create(self, user, code):
+        return OTP.objects.create(
+            user=user,
+            code=code,
+            expires_at=timezone.now() + get_otp_lifetime(),
+        )
+
+    def create_many(self, pairs):
+        expires_at = timezone.now() + get_otp_lifetime()
+        OTP.objects.bulk_create([OTP(user=user, code=code, expires_at=expires_at) for user, code in pairs])
+
+    def _valid(self, user, code):
+        return OTP.objects.filter(user=user, code=code, is_used=False, expires_at__gt=timezone.now())
+
+    def check(self, user, code):
+        return self._valid(user, code).exists()
+
+    def consume(self, user, code):
+        # single conditional UPDATE, only one caller can flip is_used for a given row
+        return self._valid(user, code).update(is_used=True) > 0
+
+    async def acreate(self, user, code):
+        return await OTP.objects.acreate(
+            user=user,
+            code=code,
+            expires_at=timezone.now() + get_otp_lifetime(),
+        )
+
+    async def acheck(self, user, code):
+        return await self._valid(user, code).aexists()
+
+    async def aconsume(self, user, code):
+        return await self._valid(user, code).aupdate(is_used=True) > 0
+
+
+class CacheOTPBackend(BaseOTPBackend):
+    """OTPs kept in the Django cache and expired by the cache's own TTL"""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, 'OTP_CACHE_ALIAS', 'default')]
+
+    def _key(self, user, code):
+        return f'otp:{user.pk}:{code}'
+
+    def create(self, user, code):
+        self.cache.set(self._key(user, code), 1, timeout=int(get_otp_lifetime().total_seconds()))
+
+    def create_many(self, pairs):
+        self.cache.set_many({self._key(user, code): 1 for user, code in pairs},
+                            timeout=int(get_otp_lifetime().total_seconds()))
+
+    def check(self, user, code):
+        return self.cache.get(self._key(user, code)) is not None
+
+    def consume(self, user, code):
+        # delete() reports whether the key existed, so it doubles as an atomic GETDEL
+        return bool(self.cache.delete(self._key(user, code)))
+
+    async def acreate(self, user, code):
+        await self.cache.aset(self._key(user, code), 1, timeout=int(get_otp_lifetime().total_seconds()))
+
+    async def acheck(self, user, code):
+        return await self.cache.aget(self._key(user, code)) is not None
+
+    async def aconsume(self, user, code):
+        return bool(await self.cache.adelete(self._key(user, code)))
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_otp_backend() -> BaseOTPBackend:
+    return _load_backend(getattr(settings, 'OTP_BACKEND', 'accounts.otp.DatabaseOTPBackend'))
+
+
+def purgeable_otps(now=None):
+    """Used or expired OTP rows"""
+    return OTP.objects.filter(Q(is_used=True) | Q(expires_at__lte=now or timezone.now()))
+
+
+def purge_otps(batch_size=1000, sleep=0.0, now=None):
+    """
+    Delete used and expired OTPs in primary-key ordered chunks so no single
+    statement holds locks for long. Yields the number of rows removed per chunk.
+    """
+    return chunked_delete(purgeable_otps(now or timezone.now()), batch_size=batch_size, sleep=sleep)
+
+
+_purge_timer = None
+
+
+def start_otp_purge_scheduler(interval, batch_size=1000, sleep=0.0):
+    """Run purge_otps every `interval` seconds on a daemon thread in this process"""
+    if _purge_timer is not None:
+        return _purge_timer
+
+    def run():
+        try:
+            close_old_connections()
+            total = sum(purge_otps(batch_size=batch_size, sleep=sleep))
+            if total:
+                logger.info("Purged %d used or expired OTPs", total)
+        except Exception:
+            logger.exception("Scheduled OTP purge failed")
+        finally:
+            close_old_connections()
+        schedule()
+
+    def schedule():
+        global _purge_timer
+        _purge_timer = threading.Timer(interval, run)
+        _purge_timer.daemon = True
+        _purge_timer.start()
+
+    schedule()
+    return _purge_timer
@@ -0,0 +1,97 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the full ordering tuple instead of OFFSET,
+    so page N costs the same as page 1 given an index on the ordering columns.
+    All ordering fields must share one direction and the last one must be unique.
+    """
+
+    ordering = ('-joined_at', '-id')
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        model_fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, model_fields)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(model_fields, position))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            self.next_position = [getattr(page[-1], field.attname) for field in model_fields]
+        return page
+
+    def seek_filter(self, model_fields, position):
+        """Rows strictly after `position` in ordering order: (a, b) < (x, y) spelled out as ORed Qs"""
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        clauses = []
+        for i, field in enumerate(model_fields):
+            equal = {model_fields[j].name: position[j] for j in range(i)}
+            clauses.append(Q(**equal, **{f'{field.name}__{lookup}': position[i]}))
+        return reduce(or_, clauses)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, model_fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if len(values) != len(model_fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(model_fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        payload = json.dumps([str(value) if value is not None else None for value in position])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,65 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+from .metrics import CacheStats
+
+
+profile_cache_stats = CacheStats('profile')
+
+
+def _profile_key(user_id):
+    return f'profile:{user_id}'
+
+
+def _make_etag(data):
+    payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return '"%s"' % hashlib.md5(payload).hexdigest()
+
+
+def etag_matches(etag, if_none_match):
+    """Weak comparison: compression middleware sends the ETag back with a W/ prefix"""
+    return etag in {tag.removeprefix('W/') for tag in parse_etags(if_none_match or '')}
+
+
+def set_cached_profile(user_id, data):
+    entry = {'data': dict(data), 'etag': _make_etag(data)}
+    cache.set(_profile_key(user_id), entry, timeout=getattr(settings, 'PROFILE_CACHE_TIMEOUT', 300))
+    return entry
+
+
+def get_cached_profile(user, serializer_class):
+    """Cached `{'data', 'etag'}` profile entry for the user, serialized on a miss"""
+    entry = cache.get(_profile_key(user.pk))
+    if entry is not None:
+        profile_cache_stats.hit()
+        return entry
+    profile_cache_stats.miss()
+    return set_cached_profile(user.pk, serializer_class.serialize(user))
+
+
+async def aset_cached_profile(user_id, data):
+    entry = {'data': dict(data), 'etag': _make_etag(data)}
+    await cache.aset(_profile_key(user_id), entry, timeout=getattr(settings, 'PROFILE_CACHE_TIMEOUT', 300))
+    return entry
+
+
+async def aget_cached_profile(user, serializer_class):
+    """get_cached_profile() for async views; `user` must expose an async `aload()`"""
+    entry = await cache.aget(_profile_key(user.pk))
+    if entry is not None:
+        profile_cache_stats.hit()
+        return entry
+    profile_cache_stats.miss()
+    return await aset_cached_profile(user.pk, serializer_class.serialize(await user.aload()))
+
+
+def invalidate_profile(user_id):
+    cache.delete(_profile_key(user_id))
+
+
+def invalidate_profiles(user_ids):
+    cache.delete_many([_profile_key(user_id) for user_id in user_ids])
@@ -0,0 +1,155 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import User
+from accounts.utils import send_otp_emails
+
+IMPORT_FIELDS = ('email', 'password', 'full_name', 'phone_number', 'username')
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    duplicates: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    otps_sent: int = 0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'errors': self.errors,
+            'otps_sent': self.otps_sent,
+        }
+
+
+@dataclass
+class InvalidRow:
+    """Yielded by read_rows in place of a row it can't use; import_users reports the error"""
+    error: str
+
+
+def _check_row(row):
+    if not isinstance(row, dict):
+        return InvalidRow('Expected a JSON object')
+    if row.get('password') is not None and not isinstance(row['password'], str):
+        return InvalidRow('Password must be a string')
+    return row
+
+
+def read_rows(stream, fmt):
+    """Yield dicts from a CSV (with header) or JSON-lines text stream"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield InvalidRow('Not valid JSON')
+            else:
+                yield _check_row(row)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _init_hash_worker():
+    # spawned workers (macOS/Windows) start without configured settings
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None, processes=True):
+    """
+    make_password over a pool. The PBKDF2/scrypt/argon2 hashers release the GIL,
+    so threads also scale across cores where forking a process pool is too heavy.
+    """
+    if not passwords:
+        return []
+    if workers == 1:
+        return [make_password(password) for password in passwords]
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_users(rows, batch_size=None, workers=None, processes=True, is_active=True, send_otp=False):
+    """
+    Create users from row dicts in bulk_create batches. Existing or repeated emails are
+    reported as duplicates and invalid rows as errors; neither aborts the batch.
+    """
+    batch_size = batch_size or getattr(settings, 'USER_IMPORT_BATCH_SIZE', 500)
+    result = ImportResult()
+    seen = set()
+
+    for batch_number, batch in enumerate(_batches(rows, batch_size)):
+        pending = []
+        for offset, row in enumerate(batch):
+            line = batch_number * batch_size + offset + 1
+            if isinstance(row, InvalidRow):
+                result.errors.append({'row': line, 'error': row.error})
+                continue
+            email = User.objects.normalize_email(str(row.get('email') or '').strip())
+            if not email or '@' not in email:
+                result.errors.append({'row': line, 'error': 'A valid email is required'})
+                continue
+            if email in seen:
+                result.duplicates.append(email)
+                continue
+            too_long = [name for name in IMPORT_FIELDS[2:]
+                        if len(str(row.get(name) or '')) > User._meta.get_field(name).max_length]
+            if too_long:
+                result.errors.append({'row': line, 'error': f"Too long: {', '.join(too_long)}"})
+                continue
+            seen.add(email)
+            pending.append((email, row))
+
+        existing = set(User.objects.filter(email__in=[email for email, _ in pending]).values_list('email', flat=True))
+        result.duplicates.extend(email for email, _ in pending if email in existing)
+        pending = [(email, row) for email, row in pending if email not in existing]
+
+        with_password = [row['password'] for _, row in pending if row.get('password')]
+        hashes = iter(hash_passwords(with_password, workers=workers, processes=processes))
+
+        users = []
+        for email, row in pending:
+            user = User(
+                email=email,
+                is_active=is_active,
+                **{name: str(row[name]) for name in IMPORT_FIELDS[2:] if row.get(name)},
+            )
+            if row.get('password'):
+                user.password = next(hashes)
+            else:
+                user.set_unusable_password()
+            users.append(user)
+
+        # ignore_conflicts covers rows inserted concurrently since the duplicate check
+        User.objects.bulk_create(users, batch_size=batch_size, ignore_conflicts=True)
+        created_ids = set(User.objects.filter(pk__in=[user.pk for user in users]).values_list('pk', flat=True))
+        created = [user for user in users if user.pk in created_ids]
+        result.duplicates.extend(user.email for user in users if user.pk not in created_ids)
+        result.created += len(created)
+
+        if send_otp and created:
+            result.otps_sent += send_otp_emails(created)
+
+    return result
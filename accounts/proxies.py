@@ -0,0 +1,19 @@
+"""
+The client address behind reverse proxies. X-Forwarded-For is only believed for the hops
+appended by the proxies listed in settings.TRUSTED_PROXIES; everything to the left of
+them is whatever the client sent.
+"""
+from django.conf import settings
+
+
+def client_address(request):
+    """
+    The peer address, or behind TRUSTED_PROXIES the hop the outermost trusted proxy
+    appended to X-Forwarded-For. Entries further left are client-supplied.
+    """
+    trusted = getattr(settings, 'TRUSTED_PROXIES', ())
+    address = request.META.get('REMOTE_ADDR')
+    hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    while address in trusted and hops:
+        address = hops.pop()
+    return address
@@ -0,0 +1,63 @@
+"""
+Account events pushed to connected clients over the channel layer. Every WebSocket a user
+opens (accounts.consumers) joins the group `user_group(user_id)`; the places that change
+an account call push() or apush() and each of the user's connections receives
+
+    {"type": "tokens.revoked", "token_version": 3}   password changed or reset; tokens
+                                                     older than this version are closed
+    {"type": "token.blacklisted", "jti": "..."}      a refresh token was logged out
+    {"type": "profile.changed"}                      refetch ProfileView (with If-None-Match)
+    {"type": "email.verified"}
+
+Pushes are best effort: a client that was offline reconciles with the regular endpoints
+when it reconnects. Sync pushes wait for the surrounding transaction to commit, so nobody
+refetches a profile before the change is visible.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+}
+
+TOKENS_REVOKED = 'tokens.revoked'
+TOKEN_BLACKLISTED = 'token.blacklisted'
+PROFILE_CHANGED = 'profile.changed'
+EMAIL_VERIFIED = 'email.verified'
+
+
+def realtime_setting(name):
+    return getattr(settings, 'REALTIME', {}).get(name, DEFAULTS[name])
+
+
+def user_group(user_id):
+    return f'user.{user_id}'
+
+
+def _message(event, data):
+    # `type` names the consumer handler; the event itself travels as `event`
+    return {'type': 'user.event', 'event': event, 'data': data}
+
+
+async def apush(user_id, event, **data):
+    """Send an event to every connection of the user"""
+    layer = get_channel_layer() if realtime_setting('ENABLED') else None
+    if layer is None:
+        return
+    try:
+        await layer.group_send(user_group(user_id), _message(event, data))
+    except Exception:
+        logger.warning("Could not push %s to user %s", event, user_id, exc_info=True)
+
+
+def push(user_id, event, **data):
+    """apush() for sync code, sent once the current transaction commits"""
+    if not realtime_setting('ENABLED'):
+        return
+    transaction.on_commit(lambda: async_to_sync(apush)(user_id, event, **data))
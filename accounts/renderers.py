@@ -0,0 +1,22 @@
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Binary counterpart of JSONRenderer for clients sending `Accept: application/msgpack`.
+    Values msgpack can't pack natively (UUIDs, datetimes, decimals, lazy strings) are
+    converted the same way the JSON encoder converts them.
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = encoders.JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.encoder_class().default, use_bin_type=True)
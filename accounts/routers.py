@@ -0,0 +1,210 @@
+"""
+Read-replica routing for the accounts models. Reads go to a replica whose lag is within
+REPLICA_ROUTING['MAX_LAG'] and writes go to the primary. Once a request writes, the rest
+of it reads from the primary, and so do the same client's requests for STICKY_SECONDS
+afterwards, so clients always see their own writes. Outside a request, e.g. in management
+commands, everything uses the primary.
+"""
+import logging
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .proxies import client_address
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MODELS': ('accounts.user', 'accounts.otp'),
+    'MAX_LAG': 5.0,
+    'LAG_CHECK_INTERVAL': 5.0,
+    'STICKY_SECONDS': 10,
+    'LAG_CHECK': None,
+}
+
+
+def replica_setting(name):
+    return getattr(settings, 'REPLICA_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# a mutable object rather than a flag, so writes made in a sync_to_async thread are seen by the caller
+_state: ContextVar[RoutingState | None] = ContextVar('replica_routing_state', default=None)
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """Let reads in this block use replicas; the middleware wraps every request in one"""
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def pin_primary():
+    """Send the remaining reads of the current request to the primary"""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def postgresql_lag(alias):
+    with connections[alias].cursor() as cursor:
+        # an idle primary leaves the replay timestamp old, so a replica that has replayed
+        # everything it received counts as current
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        )
+        return float(cursor.fetchone()[0] or 0)
+
+
+def _sqlite_mtime(path):
+    return max(os.path.getmtime(name) for name in (path, f'{path}-wal') if os.path.exists(name))
+
+
+def sqlite_lag(alias):
+    """
+    Local stand-in for replication lag between two SQLite files kept in step with
+    sync_sqlite_replicas: a replica is stale from its last sync once the primary changed.
+    """
+    primary = _sqlite_mtime(str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME']))
+    replica = _sqlite_mtime(str(connections[alias].settings_dict['NAME']))
+    return time.time() - replica if primary > replica else 0.0
+
+
+LAG_CHECKS = {
+    'postgresql': postgresql_lag,
+    'sqlite': sqlite_lag,
+}
+
+# alias -> (monotonic time of the check, lag in seconds or None when unreachable)
+_lag = {}
+
+
+def replica_lag(alias):
+    checked = _lag.get(alias)
+    now = time.monotonic()
+    if checked and now - checked[0] < replica_setting('LAG_CHECK_INTERVAL'):
+        return checked[1]
+
+    custom = replica_setting('LAG_CHECK')
+    check = import_string(custom) if custom else LAG_CHECKS.get(connections[alias].vendor)
+    try:
+        lag = check(alias) if check else 0.0
+    except (DatabaseError, OSError, sqlite3.Error, ValueError):
+        logger.warning("Replica %s lag check failed, routing its reads to the primary", alias, exc_info=True)
+        lag = None
+    _lag[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    max_lag = replica_setting('MAX_LAG')
+    return [alias for alias in get_replicas() if (lag := replica_lag(alias)) is not None and lag <= max_lag]
+
+
+class ReplicaRouter:
+    """Database router for the models listed in REPLICA_ROUTING['MODELS']"""
+
+    def _routed(self, model):
+        return model._meta.label_lower in replica_setting('MODELS')
+
+    def db_for_read(self, model, **hints):
+        if not self._routed(model):
+            return None
+        state = _state.get()
+        if state is None or state.pinned:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # related lookups stay on the database the instance came from
+            return instance._state.db
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Wraps each request in replica_reads() and remembers clients that wrote, by address
+    and by the user id in their access token, for STICKY_SECONDS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def pin_keys(self, request):
+        # the address covers anonymous flows such as register -> verify-email
+        keys = [f'replica_pin:ip:{client_address(request)}']
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is not None:
+            try:
+                token = authentication.get_validated_token(raw_token)
+                keys.append(f'replica_pin:user:{token[api_settings.USER_ID_CLAIM]}')
+            except (InvalidToken, KeyError):
+                pass
+        return keys
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+        keys = self.pin_keys(request)
+        with replica_reads(pinned=bool(cache.get_many(keys))) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            cache.set_many(dict.fromkeys(keys, 1), timeout=replica_setting('STICKY_SECONDS'))
+        return response
+
+    async def __acall__(self, request):
+        if not get_replicas():
+            return await self.get_response(request)
+        keys = self.pin_keys(request)
+        with replica_reads(pinned=bool(await cache.aget_many(keys))) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            await cache.aset_many(dict.fromkeys(keys, 1), timeout=replica_setting('STICKY_SECONDS'))
+        return response
@@ -1,15 +1,97 @@
+import logging
+
 from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
 from accounts.models import User
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import TOKEN_CLAIMS, get_token_version
+from .avatars import get_avatar_storage
+from .tokens import CachedRefreshToken
 from .utils import send_otp_email
 
+logger = logging.getLogger(__name__)
+
+class CanonicalEmailField(serializers.EmailField):
+    """EmailField that canonicalizes before validators run, so uniqueness checks see the stored form"""
+
+    def to_internal_value(self, data):
+        return User.objects.normalize_email(super().to_internal_value(data))
+
+
+class OptimizedModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that knows which columns and relations its declared fields read,
+    and can serialize through a shared, pre-built field set on hot read paths.
+    """
+
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.EmailField: CanonicalEmailField,
+    }
+
+    @classmethod
+    def optimize_queryset(cls, queryset):
+        """Apply only()/select_related()/prefetch_related() for the readable fields"""
+        opts = queryset.model._meta
+        only, select, prefetch = {opts.pk.attname}, set(), set()
+        can_defer = True
+        for field in cls().fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                # method fields may read anything off the instance
+                can_defer = False
+                continue
+            name = field.source.split('.')[0]
+            try:
+                model_field = opts.get_field(name)
+            except FieldDoesNotExist:
+                can_defer = False
+                continue
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch.add(name)
+            elif model_field.is_relation:
+                select.add(name)
+                only.add(name)
+            else:
+                only.add(model_field.attname)
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if can_defer:
+            queryset = queryset.only(*only)
+        return queryset
+
+    @classmethod
+    def serialize(cls, instance):
+        """Read-only representation without rebuilding the field set on every call"""
+        serializer = cls.__dict__.get('_read_serializer')
+        if serializer is None:
+            serializer = cls()
+            cls._read_serializer = serializer
+        return serializer.to_representation(instance)
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CachedRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in TOKEN_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         user = self.user
-        print("user:", user)
-        print("is_active:", user.is_active)
         if user and not user.is_active:
+            logger.info("Login by unverified account, resending OTP", extra={'user_id': str(user.pk)})
             send_otp_email(user)
             raise serializers.ValidationError({
                 'detail': 'Account is not active. An OTP has been sent to your email for verification.',
@@ -17,27 +99,58 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return data
 
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that checks the blacklist and the account through the cache. Tokens
+    carrying a token_version are validated against the cached version instead of
+    loading the user; older tokens keep the database check.
+    """
+    token_class = CachedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if 'token_version' not in refresh.payload:
+            return super().validate(attrs)
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if get_token_version(user_id) != refresh['token_version']:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
+
+
 class RegisterSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = OptimizedModelSerializer.serializer_field_mapping
+
     class Meta:
         model = User
         fields = ['id', 'full_name', 'email', 'password']
     def create(self, validated_data):
+        # User will be activated after email verification
         user = User.objects.create_user(
             email=validated_data['email'],
+            password=validated_data['password'],
             full_name=validated_data.get('full_name', ''),
+            is_active=False,
         )
-        user.set_password(validated_data['password'])
-        user.is_active = False  # User will be activated after email verification
-        user.save()
-        
+
         return user
 
 class VerifyEmailSerializer(serializers.Serializer):
-    email = serializers.EmailField()
+    email = CanonicalEmailField()
     otp = serializers.CharField(max_length=6)
 
 class ResetPasswordConfirmSerializer(serializers.Serializer):
-    email = serializers.EmailField()
+    email = CanonicalEmailField()
     otp = serializers.CharField(max_length=6)
     new_password = serializers.CharField(write_only=True)
 
@@ -51,10 +164,43 @@ class ChangePasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError("New passwords do not match")
         return data
     
-class UserSerializer(serializers.ModelSerializer):
+class AvatarThumbnailsField(serializers.Field):
+    """Storage URLs of the avatar thumbnails, {size: {format: url}}"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = get_avatar_storage()
+        return {size: {fmt: storage.url(name) for fmt, name in formats.items()}
+                for size, formats in (value or {}).items()}
+
+
+class UserSerializer(OptimizedModelSerializer):
+    avatar_thumbnails = AvatarThumbnailsField()
+
     class Meta:
         model = User
-        exclude = ['password']
+        fields = [
+            'id', 'email', 'username', 'full_name', 'phone_number', 'avatar', 'avatar_thumbnails',
+            'gender', 'age', 'date_of_birth', 'joined_at', 'last_login',
+            'is_active', 'is_staff', 'is_superuser',
+        ]
+        # avatars are uploaded through accounts.avatars, not the profile update
+        read_only_fields = ['id', 'avatar', 'joined_at', 'last_login', 'is_active', 'is_staff', 'is_superuser']
+
+
+class AvatarUploadSerializer(serializers.Serializer):
+    avatar = serializers.FileField()
+
+
+class AvatarUploadURLSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=['image/jpeg', 'image/png', 'image/webp', 'image/gif'])
+
+
+class AvatarUploadCompleteSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
 
 
 
@@ -0,0 +1,78 @@
+"""
+Sessions only where something uses them. The admin and the browsable API keep Django
+sessions, on whichever SESSION_ENGINE the deployment picks. Requests under
+SESSIONS['JWT_ONLY_PATHS'] get an empty, write-nothing session instead, so a stray
+session cookie never costs a lookup or a write there.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .db import chunked_delete
+
+DEFAULTS = {
+    'JWT_ONLY_PATHS': ('/api/',),
+}
+
+
+def sessions_setting(name):
+    return getattr(settings, 'SESSIONS', {}).get(name, DEFAULTS[name])
+
+
+def is_jwt_only(path):
+    return path.startswith(tuple(sessions_setting('JWT_ONLY_PATHS')))
+
+
+class NullSession(SessionBase):
+    """Always empty and never persisted; anything written to it is dropped with the request"""
+
+    def exists(self, session_key):
+        return False
+
+    def create(self):
+        pass
+
+    def save(self, must_create=False):
+        pass
+
+    def delete(self, session_key=None):
+        pass
+
+    def load(self):
+        return {}
+
+    @classmethod
+    def clear_expired(cls):
+        pass
+
+
+class RouteAwareSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware that gives JWT-only paths a NullSession and never sets their cookie"""
+
+    def process_request(self, request):
+        if is_jwt_only(request.path_info):
+            request.session = NullSession()
+        else:
+            super().process_request(request)
+
+    def process_response(self, request, response):
+        if isinstance(getattr(request, 'session', None), NullSession):
+            return response
+        return super().process_response(request, response)
+
+
+def purgeable_sessions():
+    """Expired rows of the session model of a database-backed SESSION_ENGINE, else None"""
+    store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+    if not hasattr(store, 'get_model_class'):
+        return None
+    return store.get_model_class().objects.filter(expire_date__lt=timezone.now())
+
+
+def purge_sessions(batch_size=1000, sleep=0.0):
+    """chunked_delete() over the expired sessions; yields rows deleted per chunk"""
+    queryset = purgeable_sessions()
+    if queryset is not None:
+        yield from chunked_delete(queryset, batch_size=batch_size, sleep=sleep)
@@ -0,0 +1,62 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_token_version, revoke_user_tokens
+from .models import User
+from .profile_cache import invalidate_profile
+from .realtime import PROFILE_CHANGED, TOKENS_REVOKED, push
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_token_version(sender, instance, **kwargs):
+    # deactivating or deleting an account must stop its tokens refreshing
+    forget_token_version(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_privilege_change(sender, instance, created, **kwargs):
+    # tokens carry is_active/is_staff as claims, so a change must retire every token issued
+    # before it. Queryset update()s bypass this and have to call revoke_user_tokens() themselves.
+    loaded = getattr(instance, '_loaded_privileges', None)
+    current = instance.privileges()
+    instance._loaded_privileges = current
+    if created or not loaded:
+        return
+    if any(loaded[name] != current[name] for name in loaded.keys() & current.keys()):
+        # keep the instance current so saving it again doesn't write the old version back
+        instance.token_version = revoke_user_tokens(instance)
+
+
+@receiver(post_save, sender=User)
+def push_account_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    if instance.is_active:
+        push(instance.pk, PROFILE_CHANGED)
+    else:
+        # without a version every open connection of the user is closed
+        push(instance.pk, TOKENS_REVOKED, token_version=None)
+
+
+@receiver(post_delete, sender=User)
+def push_account_deleted(sender, instance, **kwargs):
+    push(instance.pk, TOKENS_REVOKED, token_version=None)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_cached_profile_relations(sender, instance, reverse, pk_set, **kwargs):
+    if not kwargs['action'].startswith('post_'):
+        return
+    if reverse:
+        for user_id in pk_set or ():
+            invalidate_profile(user_id)
+    else:
+        invalidate_profile(instance.pk)
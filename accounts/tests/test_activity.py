@@ -0,0 +1,143 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.activity import LoginActivityRecorder
+from accounts.models import LoginEvent, User
+
+
+def make_event(user=None, outcome=LoginEvent.SUCCESS, at=None):
+    return LoginEvent(user_id=user.pk if user else None, email=user.email if user else 'nobody@example.com',
+                      outcome=outcome, created_at=at or timezone.now())
+
+
+class LoginActivityRecorderTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', password='pass12345')
+        self.bob = User.objects.create_user(email='bob@example.com', password='pass12345')
+
+    def make_recorder(self, **kwargs):
+        recorder = LoginActivityRecorder(flush_interval=60, **kwargs)
+        recorder._ensure_started = lambda: None
+        return recorder
+
+    def test_flush_writes_a_batch_in_two_statements(self):
+        recorder = self.make_recorder()
+        now = timezone.now()
+        recorder.record(make_event(self.alice, at=now - timedelta(minutes=1)))
+        recorder.record(make_event(self.alice, at=now))
+        recorder.record(make_event(self.bob, at=now))
+        recorder.record(make_event(outcome=LoginEvent.FAILED))
+
+        with CaptureQueriesContext(connection) as queries:
+            recorder.flush()
+
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(LoginEvent.objects.count(), 4)
+        self.assertEqual(User.objects.get(pk=self.alice.pk).last_login, now)
+        self.assertEqual(User.objects.get(pk=self.bob.pk).last_login, now)
+        self.assertEqual(recorder.pending(), 0)
+
+    def test_last_login_never_moves_backwards(self):
+        now = timezone.now()
+        User.objects.filter(pk=self.alice.pk).update(last_login=now)
+        recorder = self.make_recorder()
+        recorder.record(make_event(self.alice, at=now - timedelta(hours=1)))
+        recorder.flush()
+        self.assertEqual(User.objects.get(pk=self.alice.pk).last_login, now)
+
+    def test_failed_logins_are_matched_to_accounts_on_flush(self):
+        User.objects.filter(pk=self.bob.pk).update(is_active=False)
+        recorder = self.make_recorder()
+        with self.assertNumQueries(0):
+            for email in ('alice@example.com', 'bob@example.com', 'nobody@example.com'):
+                recorder.record(LoginEvent(email=email, outcome=LoginEvent.FAILED))
+        recorder.flush()
+        self.assertEqual(sorted(LoginEvent.objects.values_list('email', 'user_id', 'outcome')), [
+            ('alice@example.com', self.alice.pk, 'failed'),
+            ('bob@example.com', self.bob.pk, 'inactive'),
+            ('nobody@example.com', None, 'failed'),
+        ])
+
+    def test_full_buffer_drops_events(self):
+        recorder = self.make_recorder(maxsize=1)
+        self.assertTrue(recorder.record(make_event(self.alice)))
+        self.assertFalse(recorder.record(make_event(self.bob)))
+        self.assertEqual(recorder.pending(), 1)
+
+    def test_flusher_writes_once_a_batch_is_full(self):
+        recorder = LoginActivityRecorder(batch_size=2, flush_interval=60)
+        with mock.patch.object(recorder, 'flush') as flush:
+            flush.side_effect = lambda: recorder._events.clear()
+            recorder.record(make_event(self.alice))
+            recorder.record(make_event(self.bob))
+            for _ in range(100):
+                if flush.called:
+                    break
+                recorder._thread.join(0.01)
+        flush.assert_called()
+
+
+@override_settings(LOGIN_ACTIVITY={'ASYNC': False})
+class LoginActivityViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient(HTTP_USER_AGENT='tests/1.0')
+        self.user = User.objects.create_user(email='alice@example.com', password='pass12345')
+
+    def test_successful_login(self):
+        response = self.client.post(reverse('login'), {'email': 'Alice@example.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+
+        event = LoginEvent.objects.get()
+        self.assertEqual((event.user_id, event.email, event.outcome), (self.user.pk, 'alice@example.com', 'success'))
+        self.assertEqual((event.ip_address, event.user_agent), ('127.0.0.1', 'tests/1.0'))
+        self.assertIsNotNone(User.objects.get(pk=self.user.pk).last_login)
+
+    def test_failed_login(self):
+        response = self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+        event = LoginEvent.objects.get()
+        self.assertEqual((event.user_id, event.outcome), (self.user.pk, 'failed'))
+        self.assertIsNone(User.objects.get(pk=self.user.pk).last_login)
+
+    def test_inactive_account(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(LoginEvent.objects.get().outcome, 'inactive')
+
+    def test_unknown_account_and_non_object_body(self):
+        self.client.post(reverse('login'), {'email': 'nobody@example.com', 'password': 'pass12345'})
+        response = self.client.post(reverse('login'), ['alice@example.com'], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(LoginEvent.objects.order_by('created_at').values_list('user_id', 'email', 'outcome')),
+                         [(None, 'nobody@example.com', 'failed'), (None, '', 'failed')])
+
+    @override_settings(LOGIN_ACTIVITY={'ENABLED': False})
+    def test_disabled(self):
+        self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'pass12345'})
+        self.assertFalse(LoginEvent.objects.exists())
+
+    async def test_async_login(self):
+        response = await self.async_client.post(
+            reverse('async_accounts:login'), {'email': 'alice@example.com', 'password': 'pass12345'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        event = await LoginEvent.objects.aget()
+        self.assertEqual((event.user_id, event.outcome), (self.user.pk, 'success'))
+
+    async def test_async_login_rejects_non_object_body(self):
+        response = await self.async_client.post(reverse('async_accounts:login'), ['alice@example.com'],
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,170 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import OTP, User
+from accounts.otp import DatabaseOTPBackend
+from accounts.serializers import CustomTokenObtainPairSerializer
+from accounts.throttling import LoginRateThrottle
+
+
+@override_settings(EMAIL_HOST_USER='user', EMAIL_HOST_PASSWORD='secret', MAIL_QUEUE={'ASYNC': False})
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_register_then_verify(self):
+        response = await self.async_client.post(
+            reverse('async_accounts:register'),
+            {'email': 'async@example.com', 'password': 'pass12345', 'full_name': 'Async'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 1)
+
+        otp = await OTP.objects.select_related('user').aget(user__email='async@example.com')
+        response = await self.async_client.post(
+            reverse('async_accounts:verify_email'),
+            {'email': 'async@example.com', 'otp': otp.code},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        user = await User.objects.aget(email='async@example.com')
+        self.assertTrue(user.is_active)
+        self.assertTrue(await user.acheck_password('pass12345'))
+
+    async def test_register_rejects_duplicate_email(self):
+        await User.objects.acreate_user(email='taken@example.com', password='pass12345')
+        response = await self.async_client.post(
+            reverse('async_accounts:register'),
+            {'email': 'taken@example.com', 'password': 'pass12345'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_register_race_is_a_duplicate(self):
+        await User.objects.acreate_user(email='race@example.com', password='pass12345')
+        # the other registration commits between the existence check and the insert
+        with mock.patch.object(QuerySet, 'aexists', mock.AsyncMock(return_value=False)):
+            response = await self.async_client.post(
+                reverse('async_accounts:register'),
+                {'email': 'race@example.com', 'password': 'pass12345'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    async def test_login_validates_credentials(self):
+        url = reverse('async_accounts:login')
+        response = await self.async_client.post(url, {'email': ['a@example.com'], 'password': 'x'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+        response = await self.async_client.post(url, {'email': 'a@example.com'}, content_type='application/json')
+        self.assertEqual(response.json(), {'password': ['This field is required.']})
+        response = await self.async_client.post(url, {'email': 5, 'password': 'x'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_login_and_profile(self):
+        await User.objects.acreate_user(email='login@example.com', password='pass12345')
+        response = await self.async_client.post(
+            reverse('async_accounts:login'),
+            {'email': 'login@example.com', 'password': 'pass12345'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        auth = {'Authorization': f"Bearer {response.json()['access']}"}
+
+        response = await self.async_client.get(reverse('async_accounts:profile'), headers=auth)
+        self.assertEqual(response.json()['email'], 'login@example.com')
+        response = await self.async_client.get(
+            reverse('async_accounts:profile'), headers={**auth, 'If-None-Match': response['ETag']},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_profile_requires_token(self):
+        response = await self.async_client.get(reverse('async_accounts:profile'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_change_password_revokes_token(self):
+        user = await User.objects.acreate_user(email='change@example.com', password='pass12345')
+        token = await sync_to_async(CustomTokenObtainPairSerializer.get_token)(user)
+        auth = {'Authorization': f'Bearer {token.access_token}'}
+        response = await self.async_client.post(
+            reverse('async_accounts:change_password'),
+            {'old_password': 'pass12345', 'new_password': 'newpass12345', 'confirm_password': 'newpass12345'},
+            content_type='application/json', headers=auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(reverse('async_accounts:profile'), headers=auth)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_check_otp(self):
+        user = await User.objects.acreate_user(email='otp@example.com', password='pass12345')
+        await DatabaseOTPBackend().acreate(user, '1234')
+        response = await self.async_client.post(
+            reverse('async_accounts:check_otp'), {'email': 'otp@example.com', 'otp': '1234'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_logout_blacklists_refresh_token(self):
+        user = await User.objects.acreate_user(email='logout@example.com', password='pass12345')
+        token = await sync_to_async(CustomTokenObtainPairSerializer.get_token)(user)
+        auth = {'Authorization': f'Bearer {token.access_token}'}
+        response = await self.async_client.post(
+            reverse('async_accounts:logout'), {'refresh_token': str(token)},
+            content_type='application/json', headers=auth,
+        )
+        self.assertEqual(response.status_code, 205)
+
+        response = await self.async_client.post(
+            reverse('async_accounts:logout'), {'refresh_token': str(token)},
+            content_type='application/json', headers=auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_password_reset_then_confirm(self):
+        user = await User.objects.acreate_user(email='reset@example.com', password='pass12345')
+        token = await sync_to_async(CustomTokenObtainPairSerializer.get_token)(user)
+        response = await self.async_client.post(
+            reverse('async_accounts:password_reset'), {'email': 'reset@example.com'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 1)
+
+        otp = await OTP.objects.aget(user=user)
+        response = await self.async_client.post(
+            reverse('async_accounts:password_reset_confirm'),
+            {'email': 'reset@example.com', 'otp': otp.code, 'new_password': 'newpass12345'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        user = await User.objects.aget(pk=user.pk)
+        self.assertTrue(await user.acheck_password('newpass12345'))
+        response = await self.async_client.get(reverse('async_accounts:profile'),
+                                               headers={'Authorization': f'Bearer {token.access_token}'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_throttles_run_off_the_event_loop(self):
+        on_loop = []
+
+        def allow_request(throttle, request, view):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return True
+
+        with mock.patch.object(LoginRateThrottle, 'allow_request', allow_request):
+            await self.async_client.post(reverse('async_accounts:login'), {'email': 'nobody@example.com'},
+                                         content_type='application/json')
+        self.assertEqual(on_loop, [False])
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.authentication import ClaimsUser, JWTClaimsAuthentication, get_token_version, revoke_user_tokens
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+
+class JWTClaimsAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='claims@example.com', password='pass12345')
+        self.access = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        return JWTClaimsAuthentication().authenticate(request)
+
+    def test_claims_are_served_without_queries(self):
+        self.authenticate()  # warm the token version cache
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+            self.assertIsInstance(user, ClaimsUser)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.email, self.user.email)
+            self.assertTrue(user.is_authenticated)
+
+    def test_other_attributes_load_the_user_once(self):
+        user, _ = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.joined_at, self.user.joined_at)
+            self.assertEqual(user.full_name, self.user.full_name)
+        self.assertIsInstance(user, User)
+
+    def test_password_change_revokes_outstanding_tokens(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = client.post(reverse('change_password'), {
+            'old_password': 'pass12345',
+            'new_password': 'newpass12345',
+            'confirm_password': 'newpass12345',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get(reverse('profile')).status_code, 401)
+
+    def test_stale_instance_save_keeps_tokens_revoked(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        stale = User.objects.get(pk=self.user.pk)
+        revoke_user_tokens(self.user)
+
+        stale.full_name = 'Loaded before the revoke'
+        stale.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        self.assertEqual(client.get(reverse('profile')).status_code, 401)
+
+    def test_cache_fill_does_not_overwrite_a_revoke(self):
+        revoke_user_tokens(self.user)
+        # a reader that missed the cache and read the row from before the revoke
+        User.objects.filter(pk=self.user.pk).update(token_version=0)
+        with mock.patch.object(cache, 'get', return_value=None):
+            self.assertEqual(get_token_version(self.user.pk), 0)
+        self.assertEqual(cache.get(f'token_version:{self.user.pk}'), 1)
+
+    def test_profile_update_through_claims_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = client.patch(reverse('profile_update'), {'full_name': 'New Name'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, 'New Name')
+
+    def test_demotion_revokes_outstanding_tokens(self):
+        self.user.is_staff = True
+        self.user.save()
+        access = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(client.get(reverse('user_list')).status_code, 200)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(client.get(reverse('user_list')).status_code, 401)
+
+    def test_unrelated_saves_keep_tokens(self):
+        self.user.full_name = 'Renamed'
+        self.user.save()
+        user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
@@ -0,0 +1,89 @@
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload(size=(600, 400), fmt='PNG', name='me.png'):
+    out = io.BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(out, fmt)
+    return SimpleUploadedFile(name, out.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    AVATARS={'ASYNC': False, 'SIZES': (32, 128), 'FORMATS': ('webp', 'jpeg'), 'MAX_UPLOAD_SIZE': 200 * 1024},
+)
+class AvatarUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='avatar@example.com', password='pass12345')
+        self.client = APIClient()
+        access = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def upload(self, file):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('profile_avatar'), {'avatar': file}, format='multipart')
+
+    def test_upload_generates_thumbnails(self):
+        response = self.upload(image_upload())
+        self.assertEqual(response.status_code, 202)
+
+        self.user.refresh_from_db()
+        self.assertEqual(set(self.user.avatar_thumbnails), {'32', '128'})
+        storage = storages['default']
+        for size, formats in self.user.avatar_thumbnails.items():
+            self.assertEqual(set(formats), {'webp', 'jpeg'})
+            for fmt, name in formats.items():
+                with storage.open(name) as f, Image.open(f) as image:
+                    self.assertEqual(image.size, (int(size), int(size)))
+                    self.assertEqual(image.format, fmt.upper())
+
+        profile = self.client.get(reverse('profile')).json()
+        self.assertTrue(profile['avatar_thumbnails']['128']['webp'].endswith('_128.webp'))
+
+    def test_replacing_the_avatar_removes_old_files(self):
+        self.upload(image_upload())
+        self.user.refresh_from_db()
+        old = [self.user.avatar.name, self.user.avatar_thumbnails['32']['jpeg']]
+        self.upload(image_upload(fmt='JPEG', name='new.jpg'))
+        self.assertFalse(any(storages['default'].exists(name) for name in old))
+
+    def test_oversized_upload_is_rejected_before_it_is_stored(self):
+        big = SimpleUploadedFile('big.png', b'\0' * (300 * 1024), content_type='image/png')
+        response = self.upload(big)
+        self.assertEqual(response.status_code, 413)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+    def test_non_image_is_rejected(self):
+        response = self.upload(SimpleUploadedFile('me.png', b'not an image', content_type='image/png'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_update_cannot_set_the_avatar(self):
+        response = self.client.patch(reverse('profile_update'), {'avatar': 'avatars/elsewhere.png'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+    def test_presigned_upload_needs_s3_storage(self):
+        response = self.client.post(reverse('profile_avatar_upload_url'), {'content_type': 'image/png'}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import msgpack
+import zstandard
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.compression import negotiate_encoding
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+
+class NegotiateEncodingTest(SimpleTestCase):
+    def test_prefers_zstd_on_a_tie(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate, zstd').name, 'zstd')
+
+    def test_client_weights_win(self):
+        self.assertEqual(negotiate_encoding('zstd;q=0.5, gzip').name, 'gzip')
+        self.assertEqual(negotiate_encoding('*;q=0.1, zstd;q=0').name, 'gzip')
+
+    def test_nothing_acceptable(self):
+        self.assertIsNone(negotiate_encoding(''))
+        self.assertIsNone(negotiate_encoding('identity, deflate'))
+
+
+@override_settings(COMPRESSION={'MIN_SIZE': 0})
+class CompressionMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='compress@example.com', password='pass12345', is_staff=True)
+        self.client = APIClient()
+        access = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_profile_is_compressed_and_revalidates(self):
+        response = self.client.get(reverse('profile'), HTTP_ACCEPT_ENCODING='gzip, zstd')
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(response.content))
+        self.assertEqual(body['email'], self.user.email)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        response = self.client.get(reverse('profile'), HTTP_ACCEPT_ENCODING='zstd',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(COMPRESSION={'MIN_SIZE': 100_000})
+    def test_small_responses_are_left_alone(self):
+        response = self.client.get(reverse('profile'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_streaming_export_is_compressed(self):
+        response = self.client.get(reverse('user_export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        csv = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertTrue(csv.startswith('id,email,'))
+        self.assertIn(self.user.email, csv)
+
+    def test_msgpack_response(self):
+        response = self.client.get(reverse('profile'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['id'], str(self.user.pk))
+
+    def test_msgpack_and_gzip_request_bodies(self):
+        self.client.credentials()
+        credentials = {'email': self.user.email, 'password': 'pass12345'}
+        response = self.client.post(reverse('login'), msgpack.packb(credentials),
+                                    content_type='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse('login'), gzip.compress(json.dumps(credentials).encode()),
+                                    content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+
+    @override_settings(COMPRESSION={'MAX_REQUEST_SIZE': 1000})
+    def test_request_bodies_that_inflate_too_far_are_rejected(self):
+        bomb = zstandard.ZstdCompressor().compress(b'{"email": "' + b'a' * 100_000 + b'"}')
+        response = self.client.post(reverse('login'), bomb, content_type='application/json',
+                                    HTTP_CONTENT_ENCODING='zstd')
+        self.assertEqual(response.status_code, 413)
+
+    def test_unsupported_request_encoding(self):
+        response = self.client.post(reverse('login'), b'...', content_type='application/json',
+                                    HTTP_CONTENT_ENCODING='compress')
+        self.assertEqual(response.status_code, 415)
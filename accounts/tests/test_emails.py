@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+
+class CanonicalEmailTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='  Alice@Example.COM ', password='pass12345')
+
+    def test_stored_in_canonical_form(self):
+        self.assertEqual(self.user.email, 'alice@example.com')
+
+    def test_saves_and_forms_store_the_canonical_form(self):
+        self.user.email = ' Alice@Example.COM'
+        self.user.save()
+        self.assertTrue(User.objects.filter(email='alice@example.com').exists())
+
+        other = User(email='Bob@Example.com')
+        other.set_unusable_password()
+        other.full_clean()
+        self.assertEqual(other.email, 'bob@example.com')
+
+        with self.assertRaises(ValidationError):
+            User(email='ALICE@example.com', password='x').full_clean()
+
+    def test_lookup_is_a_single_equality_seek(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(User.objects.filter_by_email('ALICE@example.com').first(), self.user)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('LOWER', queries[0]['sql'].upper())
+
+    def test_login_ignores_case(self):
+        response = self.client.post(reverse('login'), {'email': 'ALICE@EXAMPLE.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_otp_views_find_mixed_case_addresses(self):
+        response = self.client.post(reverse('check_otp'), {'email': 'Alice@example.com', 'otp': '000000'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_string_emails_match_nobody(self):
+        for email in (['alice@example.com'], 5):
+            body = {'email': email, 'otp': '0000', 'password': 'pass12345'}
+            response = self.client.post(reverse('password_reset'), body, format='json')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post(reverse('check_otp'), body, format='json')
+            self.assertEqual(response.status_code, 404)
+            response = self.client.post(reverse('async_accounts:password_reset'), body, format='json')
+            self.assertEqual(response.status_code, 400)
+        with self.assertRaises(User.DoesNotExist):
+            User.objects.get_by_natural_key(['alice@example.com'])
+
+    def test_register_rejects_another_spelling(self):
+        response = self.client.post(reverse('register'), {'email': 'ALICE@example.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    def test_database_rejects_a_second_spelling(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.bulk_create([User(email='ALICE@example.com')])
+
+    def test_canonicalize_emails_backfills_old_rows(self):
+        User.objects.filter(pk=self.user.pk).update(email='Alice@Example.COM')
+        User.objects.create_user(email='bob@example.com', password=None)
+
+        out = StringIO()
+        call_command('canonicalize_emails', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Canonicalized 1 emails', out.getvalue())
+        self.assertEqual(sorted(User.objects.values_list('email', flat=True)),
+                         ['alice@example.com', 'bob@example.com'])
@@ -0,0 +1,62 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.hashers import HashingPool, check_password, make_password
+from accounts.models import User
+
+
+def hashing(**overrides):
+    # PASSWORD_HASHERS is overridden too so Django drops its cached hasher instances
+    return override_settings(
+        PASSWORD_HASHING={**settings.PASSWORD_HASHING, **overrides},
+        PASSWORD_HASHERS=list(settings.PASSWORD_HASHERS),
+    )
+
+
+class HashingPoolTest(TestCase):
+    def test_pool_round_trip(self):
+        encoded = make_password('secret-password')
+        self.assertTrue(check_password('secret-password', encoded))
+        self.assertFalse(check_password('wrong-password', encoded))
+
+    def test_async_run(self):
+        pool = HashingPool(workers=2, max_pending=2)
+        self.assertEqual(async_to_sync(pool.arun)(sum, [1, 2, 3]), 6)
+
+    @hashing(PBKDF2_ITERATIONS=1000)
+    def test_iterations_come_from_settings(self):
+        encoded = make_password('secret')
+        self.assertEqual(identify_hasher(encoded).decode(encoded)['iterations'], 1000)
+
+
+class RehashOnLoginTest(TestCase):
+    def login(self):
+        return self.client.post(reverse('login'), {'email': 'rehash@example.com', 'password': 'pass12345'})
+
+    def test_outdated_iterations_are_upgraded(self):
+        with hashing(PBKDF2_ITERATIONS=1000):
+            User.objects.create_user(email='rehash@example.com', password='pass12345')
+
+        with hashing(PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 200)
+        encoded = User.objects.get(email='rehash@example.com').password
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$2000$'))
+
+    def test_algorithm_switch_is_upgraded(self):
+        with hashing(PBKDF2_ITERATIONS=1000):
+            User.objects.create_user(email='rehash@example.com', password='pass12345')
+
+        hashers = list(settings.PASSWORD_HASHERS)
+        hashers.insert(0, hashers.pop(hashers.index('accounts.hashers.ScryptPasswordHasher')))
+        with override_settings(PASSWORD_HASHERS=hashers,
+                               PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'SCRYPT_WORK_FACTOR': 2 ** 10}):
+            self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(User.objects.get(email='rehash@example.com').password.startswith('scrypt$1024$'))
+
+    def test_async_check_password(self):
+        with hashing(PBKDF2_ITERATIONS=1000):
+            user = User.objects.create_user(email='rehash@example.com', password='pass12345')
+            self.assertTrue(async_to_sync(user.acheck_password)('pass12345'))
@@ -1,9 +1,55 @@
-from django.contrib.auth import get_user_model
-from django.test import TestCase
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
 
 class LoginAPITest(TestCase):
     def setUp(self):
-        pass
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='login@example.com', password='pass12345')
 
     def test_login(self):
-        self.assertEqual(1, 1)
+        response = self.client.post(reverse('login'), {'email': 'login@example.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertIn('refresh', response.data)
+
+    def test_wrong_password(self):
+        response = self.client.post(reverse('login'), {'email': 'login@example.com', 'password': 'nope'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_then_logout(self):
+        tokens = self.client.post(reverse('login'), {'email': 'login@example.com', 'password': 'pass12345'}).data
+        refreshed = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}).data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refreshed['access']}")
+        response = self.client.post(reverse('logout'), {'refresh_token': refreshed['refresh']})
+        self.assertEqual(response.status_code, 205)
+        response = self.client.post(reverse('token_refresh'), {'refresh': refreshed['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+
+class AuthFlowBenchmarkTest(TransactionTestCase):
+    def test_runs_every_flow_step_and_writes_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'results.json'
+            call_command('bench_auth_flows', '--users', '2', '--flows', '2', '--concurrency', '1',
+                         '--output', str(output), stdout=StringIO())
+            results = json.loads(output.read_text())
+
+        self.assertEqual(list(results['endpoints']),
+                         ['register', 'verify-email', 'login', 'token/refresh', 'profile', 'logout'])
+        for stats in results['endpoints'].values():
+            self.assertEqual(stats['requests'], 2)
+            self.assertEqual(stats['errors'], 0)
+            self.assertIsNotNone(stats['queries_per_request'])
+        self.assertFalse(User.objects.exists())
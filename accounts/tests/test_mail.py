@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+
+from accounts.mail import MailQueue, queue_mail
+from accounts.models import User
+from accounts.utils import send_otp_email
+
+
+def make_message(to='user@example.com'):
+    return EmailMessage('Subject', 'Body', 'noreply@example.com', [to])
+
+
+class MailQueueTest(TestCase):
+    def test_flush_sends_batch_over_one_connection(self):
+        mail_queue = MailQueue(batch_size=10, poll_interval=60)
+        mail_queue._ensure_started = lambda: None
+        for i in range(5):
+            mail_queue.enqueue(make_message(f'user{i}@example.com'))
+
+        with mock.patch('accounts.mail.get_connection', wraps=mail.get_connection) as get_connection:
+            mail_queue.flush()
+
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail_queue.pending(), 0)
+
+    def test_dispatch_retries_with_backoff(self):
+        mail_queue = MailQueue(max_retries=2, retry_backoff=0.01)
+        connection = mock.Mock()
+        connection.send_messages.side_effect = [OSError('smtp down'), 1]
+
+        with mock.patch('accounts.mail.get_connection', return_value=connection), \
+                mock.patch('accounts.mail.time.sleep') as sleep:
+            self.assertTrue(mail_queue._dispatch([make_message()]))
+
+        self.assertEqual(connection.send_messages.call_count, 2)
+        sleep.assert_called_once_with(0.01)
+
+    def test_dispatch_gives_up_after_max_retries(self):
+        mail_queue = MailQueue(max_retries=1, retry_backoff=0)
+        connection = mock.Mock()
+        connection.send_messages.side_effect = OSError('smtp down')
+
+        with mock.patch('accounts.mail.get_connection', return_value=connection):
+            self.assertFalse(mail_queue._dispatch([make_message()]))
+        self.assertEqual(connection.send_messages.call_count, 2)
+
+    def test_retry_resends_only_undelivered_messages(self):
+        mail_queue = MailQueue(max_retries=1, retry_backoff=0)
+        connection = mock.Mock()
+        connection.send_messages.side_effect = [1, OSError('smtp down'), 1]
+        messages = [make_message('first@example.com'), make_message('second@example.com')]
+
+        with mock.patch('accounts.mail.get_connection', return_value=connection):
+            self.assertTrue(mail_queue._dispatch(messages))
+        recipients = [call.args[0][0].to for call in connection.send_messages.call_args_list]
+        self.assertEqual(recipients, [['first@example.com'], ['second@example.com'], ['second@example.com']])
+
+    def test_full_queue_rejects_message(self):
+        mail_queue = MailQueue(maxsize=1)
+        mail_queue._ensure_started = lambda: None
+        self.assertTrue(mail_queue.enqueue(make_message()))
+        self.assertFalse(mail_queue.enqueue(make_message()))
+
+    @override_settings(MAIL_QUEUE={'ASYNC': False})
+    def test_sync_mode_sends_inline(self):
+        self.assertTrue(queue_mail('Subject', 'Body', 'noreply@example.com', ['user@example.com']))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(MAIL_QUEUE={'ASYNC': False})
+    def test_sync_mode_does_not_back_off(self):
+        with mock.patch('accounts.mail.get_connection') as get_connection, \
+                mock.patch('accounts.mail.time.sleep') as sleep:
+            get_connection.return_value.send_messages.side_effect = OSError('smtp down')
+            self.assertFalse(queue_mail('Subject', 'Body', 'noreply@example.com', ['user@example.com']))
+        sleep.assert_not_called()
+        self.assertEqual(get_connection.return_value.send_messages.call_count, 1)
+
+
+@override_settings(EMAIL_HOST_USER='user', EMAIL_HOST_PASSWORD='secret', MAIL_QUEUE={'ASYNC': False})
+class SendOTPEmailTest(TestCase):
+    def test_send_otp_email_creates_otp_and_sends(self):
+        user = User.objects.create_user(email='otp@example.com', password='pass12345')
+        self.assertTrue(send_otp_email(user))
+        self.assertEqual(user.otps.count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(user.otps.get().code, mail.outbox[0].body)
@@ -0,0 +1,91 @@
+import json
+import logging
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.logs import JSONFormatter
+from accounts.metrics import REQUEST_LATENCY, Counter, Histogram, Registry
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+
+class RegistryTest(SimpleTestCase):
+    def test_prometheus_exposition(self):
+        registry = Registry()
+        counter = Counter('jobs_total', 'Jobs run', ('queue',), registry=registry)
+        histogram = Histogram('job_seconds', 'Job time', buckets=(0.1, 1.0), registry=registry)
+        counter.inc(queue='mail "bulk"')
+        counter.inc(2, queue='mail "bulk"')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE jobs_total counter', lines)
+        self.assertIn('jobs_total{queue="mail \\"bulk\\""} 3', lines)
+        self.assertIn('job_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('job_seconds_bucket{le="1.0"} 2', lines)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('job_seconds_count 3', lines)
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='metrics@example.com', password='pass12345')
+        self.client = APIClient()
+
+    def test_server_timing_and_latency_histogram(self):
+        access = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        before = REQUEST_LATENCY.count(view='api/accounts/profile/', method='GET', status=200)
+
+        response = self.client.get(reverse('profile'))
+
+        self.assertEqual(REQUEST_LATENCY.count(view='api/accounts/profile/', method='GET', status=200), before + 1)
+        timing = response['Server-Timing']
+        self.assertIn('app;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('miss"', timing)
+
+    def test_login_reports_hashing_time(self):
+        response = self.client.post(reverse('login'), {'email': self.user.email, 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hash;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('profile'))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_request_duration_seconds_bucket{view="api/accounts/profile/"', response.content.decode())
+
+    @override_settings(METRICS={'TOKEN': 'scrape-secret'})
+    def test_metrics_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint_ignores_debug(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+
+    @override_settings(METRICS={'ALLOWED_IPS': ('10.0.0.5',)}, TRUSTED_PROXIES=('127.0.0.1',))
+    def test_metrics_endpoint_behind_a_proxy(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_X_FORWARDED_FOR='10.0.0.5').status_code, 200)
+        # the proxy appends the peer it saw; a client can only prepend
+        self.assertEqual(self.client.get('/metrics', HTTP_X_FORWARDED_FOR='10.0.0.5, 203.0.113.9').status_code, 403)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class JSONFormatterTest(SimpleTestCase):
+    def test_extra_fields_become_keys(self):
+        record = logging.makeLogRecord({'name': 'accounts.utils', 'levelname': 'INFO', 'msg': 'Sending %s',
+                                        'args': ('OTP email',), 'user_id': 'abc'})
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual(entry['message'], 'Sending OTP email')
+        self.assertEqual(entry['user_id'], 'abc')
+        self.assertEqual(entry['logger'], 'accounts.utils')
@@ -0,0 +1,121 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import OTP, User
+from accounts.otp import CacheOTPBackend, DatabaseOTPBackend
+from accounts.utils import use_otp
+
+
+class DatabaseOTPBackendTest(TestCase):
+    def setUp(self):
+        self.backend = DatabaseOTPBackend()
+        self.user = User.objects.create_user(email='otp@example.com', password='pass12345')
+
+    def test_consume_only_once(self):
+        self.backend.create(self.user, '1234')
+        self.assertTrue(self.backend.check(self.user, '1234'))
+        self.assertTrue(self.backend.consume(self.user, '1234'))
+        self.assertFalse(self.backend.check(self.user, '1234'))
+        self.assertFalse(self.backend.consume(self.user, '1234'))
+
+    def test_expired_otp_is_rejected(self):
+        OTP.objects.create(user=self.user, code='1234', expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(self.backend.check(self.user, '1234'))
+        self.assertFalse(self.backend.consume(self.user, '1234'))
+
+    def test_consume_is_a_single_query(self):
+        self.backend.create(self.user, '1234')
+        with self.assertNumQueries(1):
+            self.assertTrue(self.backend.consume(self.user, '1234'))
+
+
+class CacheOTPBackendTest(TestCase):
+    def setUp(self):
+        self.backend = CacheOTPBackend()
+        self.backend.cache.clear()
+        self.user = User.objects.create_user(email='otp@example.com', password='pass12345')
+
+    def test_consume_only_once_without_queries(self):
+        self.backend.create(self.user, '1234')
+        with self.assertNumQueries(0):
+            self.assertTrue(self.backend.check(self.user, '1234'))
+            self.assertTrue(self.backend.consume(self.user, '1234'))
+            self.assertFalse(self.backend.consume(self.user, '1234'))
+        self.assertFalse(OTP.objects.exists())
+
+    def test_wrong_code_is_rejected(self):
+        self.backend.create(self.user, '1234')
+        self.assertFalse(self.backend.check(self.user, '4321'))
+
+
+class PurgeOTPsCommandTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='otp@example.com', password='pass12345')
+        now = timezone.now()
+        for i in range(5):
+            OTP.objects.create(user=self.user, code=str(1000 + i), expires_at=now - timedelta(minutes=1))
+        OTP.objects.create(user=self.user, code='2000', is_used=True, expires_at=now + timedelta(minutes=5))
+        self.live = OTP.objects.create(user=self.user, code='3000', expires_at=now + timedelta(minutes=5))
+
+    def test_dry_run_only_counts(self):
+        out = StringIO()
+        call_command('purge_otps', '--dry-run', stdout=out)
+        self.assertIn('6 OTPs would be purged', out.getvalue())
+        self.assertEqual(OTP.objects.count(), 7)
+
+    def test_purges_in_chunks_and_keeps_live_otps(self):
+        out = StringIO()
+        call_command('purge_otps', '--batch-size', '2', stdout=out)
+        self.assertIn('Purged 6 OTPs', out.getvalue())
+        self.assertEqual(list(OTP.objects.all()), [self.live])
+
+
+class ConcurrentOTPConsumeTest(TransactionTestCase):
+    def test_otp_is_consumed_exactly_once(self):
+        user = User.objects.create_user(email='race@example.com', password='pass12345')
+        DatabaseOTPBackend().create(user, '1234')
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(use_otp(user, '1234'))
+            except OperationalError:
+                # sqlite may refuse a concurrent writer outright, which is still not a double consume
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(len(results), 8)
+
+
+class VerifyEmailViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='verify@example.com', password='pass12345', is_active=False)
+        DatabaseOTPBackend().create(self.user, '1234')
+
+    def test_verify_activates_user_once(self):
+        response = self.client.post(reverse('verify_email'), {'email': self.user.email, 'otp': '1234'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    def test_reused_otp_is_rejected(self):
+        use_otp(self.user, '1234')
+        response = self.client.post(reverse('verify_email'), {'email': self.user.email, 'otp': '1234'})
+        self.assertEqual(response.status_code, 400)
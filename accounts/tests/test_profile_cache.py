@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.profile_cache import profile_cache_stats
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+
+class ProfileCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        profile_cache_stats.reset()
+        self.user = User.objects.create_user(email='profile@example.com', password='pass12345')
+        self.client = APIClient()
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_second_read_is_served_from_cache(self):
+        first = self.client.get(reverse('profile'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('profile'))
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(profile_cache_stats.as_dict()['hits'], 1)
+        self.assertEqual(profile_cache_stats.as_dict()['misses'], 1)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get(reverse('profile'))['ETag']
+        response = self.client.get(reverse('profile'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_update_refreshes_cached_profile(self):
+        etag = self.client.get(reverse('profile'))['ETag']
+        self.client.patch(reverse('profile_update'), {'full_name': 'Changed'})
+        response = self.client.get(reverse('profile'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['full_name'], 'Changed')
+
+    def test_model_save_invalidates(self):
+        self.client.get(reverse('profile'))
+        self.user.full_name = 'Saved Elsewhere'
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('profile')).json()['full_name'], 'Saved Elsewhere')
@@ -0,0 +1,93 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import OTP, User
+from accounts.provisioning import import_users, read_rows
+
+CSV = (
+    "email,password,full_name\n"
+    "new1@example.com,pass12345,New One\n"
+    "new2@example.com,,New Two\n"
+    "new1@example.com,pass12345,Repeat\n"
+    "taken@example.com,pass12345,Taken\n"
+    ",pass12345,No Email\n"
+)
+
+
+class ImportUsersTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(email='taken@example.com', password='pass12345')
+
+    def test_import_reports_duplicates_without_aborting(self):
+        result = import_users(read_rows(io.StringIO(CSV), 'csv'), batch_size=2, workers=1)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(sorted(result.duplicates), ['new1@example.com', 'taken@example.com'])
+        self.assertEqual(result.errors, [{'row': 5, 'error': 'A valid email is required'}])
+
+        self.assertTrue(check_password('pass12345', User.objects.get(email='new1@example.com').password))
+        self.assertFalse(User.objects.get(email='new2@example.com').has_usable_password())
+
+    def test_malformed_jsonl_rows_are_reported(self):
+        jsonl = (
+            '{"email": "ok@example.com", "password": "pass12345"}\n'
+            '["not", "an", "object"]\n'
+            '{"email": "number@example.com", "password": 12345}\n'
+            '{"email": \n'
+        )
+        result = import_users(read_rows(io.StringIO(jsonl), 'jsonl'), workers=1)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [
+            {'row': 2, 'error': 'Expected a JSON object'},
+            {'row': 3, 'error': 'Password must be a string'},
+            {'row': 4, 'error': 'Not valid JSON'},
+        ])
+
+    def test_thread_pool_hashing(self):
+        rows = [{'email': f'pool{i}@example.com', 'password': f'secret{i}'} for i in range(4)]
+        with mock.patch('accounts.provisioning.ProcessPoolExecutor') as process_pool:
+            import_users(rows, workers=2, processes=False)
+        process_pool.assert_not_called()
+        user = User.objects.get(email='pool3@example.com')
+        self.assertTrue(user.check_password('secret3'))
+
+    @override_settings(EMAIL_HOST_USER='user', EMAIL_HOST_PASSWORD='secret', MAIL_QUEUE={'ASYNC': False})
+    def test_bulk_otps_for_inactive_imports(self):
+        rows = [{'email': f'verify{i}@example.com'} for i in range(3)]
+        result = import_users(rows, workers=1, is_active=False, send_otp=True)
+        self.assertEqual(result.otps_sent, 3)
+        self.assertEqual(OTP.objects.count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_command_reads_jsonl(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as f:
+            f.write('{"email": "cmd@example.com", "password": "pass12345"}\n')
+            f.flush()
+            out = io.StringIO()
+            call_command('import_users', f.name, '--workers', '1', stdout=out, stderr=io.StringIO())
+        self.assertIn('Created 1 users', out.getvalue())
+        self.assertTrue(User.objects.filter(email='cmd@example.com').exists())
+
+    def test_import_endpoint_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(email='staff@example.com', is_staff=True))
+        upload = SimpleUploadedFile('users.csv', CSV.encode(), content_type='text/csv')
+        response = client.post(reverse('user_import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+
+        upload = SimpleUploadedFile('users.jsonl', b'"bad@example.com"\n{"email": "x@example.com", "password": 1}\n')
+        response = client.post(reverse('user_import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['errors']), 2)
+
+        client.force_authenticate(User.objects.get(email='taken@example.com'))
+        self.assertEqual(client.post(reverse('user_import')).status_code, 403)
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer, UserSerializer
+from accounts.tests.utils import QueryBudgetMixin
+
+
+class EndpointQueryCountTest(QueryBudgetMixin, TestCase):
+    QUERY_BUDGETS = {
+        'profile': 1,
+        'profile_update': 2,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='budget@example.com', password='pass12345')
+        self.user.groups.add(Group.objects.create(name='staff'))
+        self.client = APIClient()
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        cache.clear()
+
+    def test_profile(self):
+        # cold cache: token version + user row, served from claims and cache after that
+        self.client.get(reverse('profile'))
+        cache.delete(f'profile:{self.user.pk}')
+        response = self.assertEndpointQueries('profile', lambda: self.client.get(reverse('profile')))
+        self.assertNotIn('groups', response.json())
+
+    def test_profile_update(self):
+        self.client.get(reverse('profile'))
+        self.assertEndpointQueries(
+            'profile_update',
+            lambda: self.client.patch(reverse('profile_update'), {'full_name': 'Budget'}),
+        )
+
+
+class UserSerializerTest(TestCase):
+    def test_optimize_queryset_defers_unused_columns(self):
+        User.objects.create_user(email='a@example.com', password='pass12345')
+        queryset = UserSerializer.optimize_queryset(User.objects.all())
+        user = queryset.get()
+        self.assertIn('password', user.get_deferred_fields())
+        with self.assertNumQueries(0):
+            UserSerializer.serialize(user)
+
+    def test_serialize_matches_data(self):
+        user = User.objects.create_user(email='b@example.com', password='pass12345')
+        self.assertEqual(UserSerializer.serialize(user), UserSerializer(user).data)
+
+    def test_protected_fields_are_read_only(self):
+        user = User.objects.create_user(email='c@example.com', password='pass12345')
+        serializer = UserSerializer(user, data={'is_staff': True, 'is_active': False}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        user.refresh_from_db()
+        self.assertFalse(user.is_staff)
+        self.assertTrue(user.is_active)
@@ -0,0 +1,92 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+
+from accounts.authentication import arevoke_user_tokens
+from accounts.consumers import CLOSE_UNAUTHORIZED
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+from project_name.asgi import application
+
+IN_MEMORY = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY)
+class UserEventsConsumerTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='alice@example.com', password='pass12345')
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.access = str(self.refresh.access_token)
+
+    async def connect(self, path=None, headers=None):
+        communicator = WebsocketCommunicator(application, path or f'/ws/accounts/events/?token={self.access}',
+                                             headers=headers)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_rejects_missing_and_invalid_tokens(self):
+        for path in ('/ws/accounts/events/', '/ws/accounts/events/?token=garbage'):
+            communicator = WebsocketCommunicator(application, path)
+            connected, code = await communicator.connect()
+            self.assertEqual((connected, code), (False, CLOSE_UNAUTHORIZED))
+
+    async def test_authorization_header(self):
+        communicator = await self.connect('/ws/accounts/events/',
+                                          headers=[(b'authorization', f'Bearer {self.access}'.encode())])
+        await communicator.disconnect()
+
+    async def test_profile_changes_are_pushed(self):
+        communicator = await self.connect()
+        self.user.full_name = 'Alice'
+        await self.user.asave(update_fields=['full_name'])
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'profile.changed'})
+        await communicator.disconnect()
+
+    async def test_revocation_closes_every_connection(self):
+        phone, laptop = await self.connect(), await self.connect()
+        await arevoke_user_tokens(self.user)
+        for communicator in (phone, laptop):
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'tokens.revoked', 'token_version': 1})
+            self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close',
+                                                                   'code': CLOSE_UNAUTHORIZED})
+
+    async def test_logout_and_password_change_from_another_device(self):
+        communicator = await self.connect()
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+        response = await sync_to_async(client.post)('/api/accounts/logout/', {'refresh_token': str(self.refresh)},
+                                                    content_type='application/json')
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(await communicator.receive_json_from(),
+                         {'type': 'token.blacklisted', 'jti': self.refresh['jti']})
+
+        response = await sync_to_async(client.post)(
+            '/api/accounts/change-password/',
+            {'old_password': 'pass12345', 'new_password': 'pass54321', 'confirm_password': 'pass54321'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        events = [await communicator.receive_json_from(), await communicator.receive_json_from()]
+        self.assertIn({'type': 'tokens.revoked', 'token_version': 1}, events)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY)
+class WebsocketBenchmarkTest(TransactionTestCase):
+    def test_connects_and_delivers_to_every_connection(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'results.json'
+            call_command('bench_websockets', '--connections', '6', '--users', '2', '--concurrency', '4',
+                         '--output', str(output), stdout=StringIO())
+            results = json.loads(output.read_text())
+
+        self.assertEqual((results['connected'], results['delivered']), (6, 6))
+        self.assertFalse(User.objects.exists())
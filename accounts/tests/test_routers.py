@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from accounts import routers
+from accounts.models import OTP, User
+from accounts.routers import ReplicaPinningMiddleware, ReplicaRouter, replica_reads
+
+LAG = {'replica': 0.0}
+
+
+def fake_lag(alias):
+    return LAG[alias]
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    REPLICA_ROUTING={'LAG_CHECK': 'accounts.tests.test_routers.fake_lag', 'MAX_LAG': 5.0, 'STICKY_SECONDS': 10},
+)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        routers._lag.clear()
+        LAG['replica'] = 0.0
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_accounts_reads_go_to_the_replica(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+            self.assertEqual(self.router.db_for_read(OTP), 'replica')
+            self.assertIsNone(self.router.db_for_read(OutstandingToken))
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        with replica_reads() as state:
+            self.assertEqual(self.router.db_for_write(OTP), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertTrue(state.wrote)
+
+    def test_lagging_replica_is_skipped(self):
+        LAG['replica'] = 30.0
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_lag_is_rechecked_only_after_the_interval(self):
+        with replica_reads():
+            self.router.db_for_read(User)
+            LAG['replica'] = 30.0
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+
+    def test_middleware_pins_the_client_after_a_write(self):
+        seen = []
+
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(OTP)
+            seen.append(self.router.db_for_read(User))
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        middleware(factory.get('/'))
+        middleware(factory.post('/'))
+        middleware(factory.get('/'))
+        middleware(factory.get('/', REMOTE_ADDR='10.0.0.2'))
+        self.assertEqual(seen, ['replica', 'default', 'default', 'replica'])
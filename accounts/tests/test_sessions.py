@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+
+class JWTOnlySessionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='pass12345')
+
+    def test_api_ignores_a_session_cookie(self):
+        client = APIClient()
+        client.force_login(self.admin)
+        self.assertEqual(client.get(reverse('profile')).status_code, 401)
+
+        access = CustomTokenObtainPairSerializer.get_token(self.admin).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        client.get(reverse('profile'))
+        with self.assertNumQueries(0):
+            response = client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_admin_still_uses_sessions(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
+
+    @override_settings(SESSIONS={'JWT_ONLY_PATHS': ()})
+    def test_session_authentication_outside_jwt_only_paths(self):
+        client = APIClient()
+        client.force_login(self.admin)
+        self.assertEqual(client.get(reverse('profile')).status_code, 200)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class PurgeSessionsTest(TestCase):
+    def test_purges_expired_sessions_in_chunks(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command('purge_sessions', '--dry-run', stdout=out)
+        self.assertIn('5 expired sessions would be purged', out.getvalue())
+
+        call_command('purge_sessions', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_nothing_to_purge_for_cookie_sessions(self):
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn('nothing to purge', out.getvalue())
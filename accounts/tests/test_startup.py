@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase, TransactionTestCase
+
+from accounts.management.commands.startup_profile import parse_import_times
+from accounts.startup import warm_up
+
+
+class ParseImportTimesTest(SimpleTestCase):
+    def test_parses_self_and_cumulative_times(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     dotenv.parser\n"
+            "import time:       154 |       2584 | dotenv\n"
+            "some other output\n"
+        )
+        self.assertEqual(parse_import_times(stderr), [('dotenv.parser', 120, 120, 2), ('dotenv', 154, 2584, 0)])
+
+
+class WarmUpTest(TransactionTestCase):
+    def test_warm_up_loads_urls_serializers_and_database(self):
+        timings = warm_up(freeze=False)
+        self.assertEqual(set(timings), {'urls', 'serializers', 'database'})
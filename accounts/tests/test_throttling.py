@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from accounts.throttling import SlidingWindowCounter, parse_rate
+
+
+def rates(**overrides):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **overrides},
+    })
+
+
+class SlidingWindowCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.counter = SlidingWindowCounter()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/10m'), (5, 600))
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+
+    def test_limit_within_window(self):
+        with mock.patch('accounts.throttling.time.time', return_value=6000.0):
+            results = [self.counter.hit('k', 3, 60)[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+    def test_previous_window_is_weighted(self):
+        with mock.patch('accounts.throttling.time.time', return_value=6000.0):
+            for _ in range(4):
+                self.counter.hit('k', 4, 60)
+        # a quarter into the next window, 3/4 of the previous 4 hits still count
+        with mock.patch('accounts.throttling.time.time', return_value=6075.0):
+            self.assertTrue(self.counter.hit('k', 4, 60)[0])
+            allowed, wait = self.counter.hit('k', 4, 60)
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0)
+
+
+class EndpointThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(email='victim@example.com', password='pass12345')
+
+    @rates(otp_check='3/10m')
+    def test_otp_guesses_are_capped_per_email(self):
+        for i in range(3):
+            response = self.client.post(reverse('check_otp'), {'email': 'victim@example.com', 'otp': f'{i:04d}'},
+                                        REMOTE_ADDR=f'10.0.0.{i}')
+            self.assertEqual(response.status_code, 400)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('check_otp'), {'email': 'victim@example.com', 'otp': '9999'},
+                                        REMOTE_ADDR='10.0.0.99')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @rates(login='2/m')
+    def test_login_is_throttled_per_ip(self):
+        for i in range(2):
+            self.client.post(reverse('login'), {'email': f'nobody{i}@example.com', 'password': 'x'})
+        response = self.client.post(reverse('login'), {'email': 'other@example.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+
+    @rates(register='2/h')
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        for i in range(2):
+            self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR=f'198.51.100.{i}')
+        response = self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='198.51.100.99')
+        self.assertEqual(response.status_code, 429)
+
+    @rates(register='1/h')
+    @override_settings(TRUSTED_PROXIES=('127.0.0.1',))
+    def test_trusted_proxy_forwards_the_client_address(self):
+        self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='198.51.100.1')
+        response = self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='198.51.100.2')
+        self.assertEqual(response.status_code, 400)
+        # a hop the client prepends is ignored
+        response = self.client.post(reverse('register'), {}, HTTP_X_FORWARDED_FOR='203.0.113.7, 198.51.100.1')
+        self.assertEqual(response.status_code, 429)
+
+    @rates(otp_check='1/10m')
+    async def test_async_views_share_the_limits(self):
+        url = reverse('async_accounts:check_otp')
+        body = {'email': 'victim@example.com', 'otp': '0000'}
+        await self.async_client.post(url, body, content_type='application/json')
+        response = await self.async_client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from accounts.tiered_cache import LocalStore
+
+TIERED = {
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test-l2'},
+    # two L1s over one L2 stand in for two worker processes
+    'worker_a': {
+        'BACKEND': 'accounts.tiered_cache.TieredCache',
+        'LOCATION': 'tiered-test-a',
+        'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 60, 'LOCK_POLL_INTERVAL': 0.01},
+    },
+    'worker_b': {
+        'BACKEND': 'accounts.tiered_cache.TieredCache',
+        'LOCATION': 'tiered-test-b',
+        'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 60, 'LOCK_POLL_INTERVAL': 0.01},
+    },
+}
+
+
+class LocalStoreTest(SimpleTestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        store = LocalStore(max_entries=2, timeout=60)
+        store.set('a', 1)
+        store.set('b', 2)
+        store.get('a')
+        store.set('c', 3)
+        self.assertEqual((store.get('a'), store.get('c')), (1, 3))
+        self.assertEqual(len(store), 2)
+
+    def test_entries_expire(self):
+        store = LocalStore(max_entries=10, timeout=60)
+        store.set('a', 1, timeout=0.01)
+        time.sleep(0.02)
+        store.get('a')
+        self.assertEqual(len(store), 0)
+
+    def test_values_are_copies(self):
+        store = LocalStore(max_entries=10, timeout=60)
+        store.set('a', {'name': 'x'})
+        store.get('a')['name'] = 'changed'
+        self.assertEqual(store.get('a'), {'name': 'x'})
+
+
+@override_settings(CACHES=TIERED)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.a, self.b = caches['worker_a'], caches['worker_b']
+        self.a.clear()
+        for cache in (self.a, self.b):
+            cache.l1_stats.reset()
+            cache.l2_stats.reset()
+
+    def test_reads_fill_the_local_tier(self):
+        caches['shared'].set('key', 'value')
+        self.assertEqual(self.a.get('key'), 'value')
+        self.assertEqual(self.a.get('key'), 'value')
+        stats = self.a.stats()
+        self.assertEqual((stats['l1']['hits'], stats['l1']['misses']), (1, 1))
+        self.assertEqual((stats['l2']['hits'], stats['l2']['misses']), (1, 0))
+
+    def test_writes_invalidate_other_local_tiers(self):
+        self.a.set('key', 'old')
+        self.assertEqual(self.b.get('key'), 'old')
+        self.a.set('key', 'new')
+        self.assertEqual(self.b.get('key'), 'new')
+        self.a.delete('key')
+        self.assertIsNone(self.b.get('key'))
+
+    def test_get_many_and_set_many(self):
+        self.a.set_many({'x': 1, 'y': 2})
+        self.assertEqual(self.b.get_many(['x', 'y', 'z']), {'x': 1, 'y': 2})
+        self.assertEqual(self.b.get_many(['x', 'y']), {'x': 1, 'y': 2})
+        self.assertEqual(self.b.stats()['l1']['hits'], 2)
+
+    def test_counters_stay_in_the_shared_tier(self):
+        self.a.add('count', 1)
+        self.assertEqual(self.b.get('count'), 1)
+        self.a.incr('count')
+        self.assertEqual(self.b.get('count'), 2)
+
+    def test_get_or_set_computes_once_across_threads(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'computed'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(caches['worker_a'].get_or_set('hot', compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['computed'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_set_waits_for_another_process(self):
+        # worker b holds the recompute lock in the shared tier and publishes its value shortly
+        caches['shared'].add('hot:single-flight', 1)
+        threading.Timer(0.05, lambda: caches['shared'].set('hot', 'from b')).start()
+        self.assertEqual(self.a.get_or_set('hot', lambda: 'from a'), 'from b')
+
+    def test_get_or_set_leaves_a_lock_it_lost(self):
+        def compute():
+            # our lock expired mid-computation and worker b took it over
+            caches['shared'].set('hot:single-flight', 'b')
+            return 'from a'
+
+        self.assertEqual(self.a.get_or_set('hot', compute), 'from a')
+        self.assertEqual(caches['shared'].get('hot:single-flight'), 'b')
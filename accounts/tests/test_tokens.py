@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+from accounts.tokens import CachedRefreshToken, is_blacklisted
+
+
+@override_settings(TOKEN_BLACKLIST_CACHE_SHARED=True)
+class RefreshBlacklistCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='refresh@example.com', password='pass12345')
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.client = APIClient()
+
+    def post_refresh(self, token):
+        return self.client.post(reverse('token_refresh'), {'refresh': str(token)}, format='json')
+
+    def blacklist_reads(self, queries):
+        return [q for q in queries if q['sql'].startswith('SELECT') and 'blacklistedtoken' in q['sql']]
+
+    def test_refresh_skips_blacklist_and_user_reads(self):
+        self.post_refresh(CustomTokenObtainPairSerializer.get_token(self.user))  # warm caches
+        with self.assertNumQueries(5) as ctx:
+            # outstanding row lookup, blacklist insert in a savepoint, new outstanding row
+            response = self.post_refresh(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.blacklist_reads(ctx.captured_queries), [])
+        self.assertFalse(any('accounts_user' in q['sql'] or '"users"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_rotated_token_is_rejected_from_cache(self):
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.post_refresh(self.refresh)
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_blacklists_in_cache(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('logout'), {'refresh_token': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 205)
+        self.assertTrue(is_blacklisted(self.refresh['jti']))
+
+    def test_cold_cache_is_warmed_from_the_database(self):
+        CachedRefreshToken(str(self.refresh)).blacklist()
+        cache.clear()
+        self.assertTrue(is_blacklisted(self.refresh['jti']))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_blacklisted(self.refresh['jti']))
+
+    def test_evicted_entry_falls_back_to_the_database(self):
+        CachedRefreshToken(str(self.refresh)).blacklist()
+        cache.delete(f"jwt_blacklist:{self.refresh['jti']}")
+        with self.assertNumQueries(1):
+            self.assertTrue(is_blacklisted(self.refresh['jti']))
+
+    def test_uncached_token_is_read_through(self):
+        cache.delete(f"jwt_blacklist:{self.refresh['jti']}")
+        with self.assertNumQueries(1):
+            self.assertFalse(is_blacklisted(self.refresh['jti'], self.refresh['exp']))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_blacklisted(self.refresh['jti'], self.refresh['exp']))
+
+    def test_deactivated_user_cannot_refresh(self):
+        self.post_refresh(CustomTokenObtainPairSerializer.get_token(self.user))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+
+class UnsharedBlacklistCacheTest(TestCase):
+    def test_locmem_misses_fall_back_to_the_database(self):
+        cache.clear()
+        user = User.objects.create_user(email='local@example.com', password='pass12345')
+        token = CustomTokenObtainPairSerializer.get_token(user)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        self.assertTrue(is_blacklisted(token['jti']))
+
+
+class PurgeTokensCommandTest(TestCase):
+    def test_purges_expired_tokens_in_chunks(self):
+        user = User.objects.create_user(email='purge@example.com', password='pass12345')
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(user=user, jti=f'old-{i}', token='x',
+                                                    expires_at=now - timedelta(days=1))
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(user=user, jti='live', token='x', expires_at=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command('purge_tokens', '--dry-run', stdout=out)
+        self.assertIn('5 expired tokens would be purged', out.getvalue())
+
+        call_command('purge_tokens', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
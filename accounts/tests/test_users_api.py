@@ -0,0 +1,78 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+
+class UserListAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(email='admin@example.com', password='pass12345', is_staff=True)
+        joined_at = timezone.now()
+        for i in range(12):
+            User.objects.create_user(
+                email=f'user{i:02d}@example.com', password='pass12345',
+                full_name=f'Person {i:02d}', is_active=i % 2 == 0,
+            )
+        # identical timestamps force the id tiebreak in the keyset
+        User.objects.exclude(pk=cls.staff.pk).update(joined_at=joined_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_requires_staff(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(email='user00@example.com'))
+        self.assertEqual(client.get(reverse('user_list')).status_code, 403)
+
+    def test_keyset_pages_cover_every_user_once(self):
+        seen = []
+        url = reverse('user_list') + '?page_size=5'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).json()
+            self.assertFalse(any('OFFSET' in q['sql'] for q in queries.captured_queries))
+            seen.extend(row['email'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(len(seen), 13)
+        self.assertEqual(len(set(seen)), 13)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('user_list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+    def test_filters_and_prefix_search(self):
+        data = self.client.get(reverse('user_list'), {'is_active': 'false'}).json()
+        self.assertEqual(len(data['results']), 6)
+
+        data = self.client.get(reverse('user_list'), {'search': 'USER0'}).json()
+        self.assertEqual(len(data['results']), 10)
+
+        data = self.client.get(reverse('user_list'), {'name': 'person 1'}).json()
+        self.assertEqual({row['email'] for row in data['results']},
+                         {'user10@example.com', 'user11@example.com'})
+
+    def test_prefix_ending_in_the_last_code_point(self):
+        for term in ('user\U0010ffff', '\U0010ffff'):
+            response = self.client.get(reverse('user_list'), {'search': term})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'], [])
+
+    def test_ndjson_export(self):
+        response = self.client.get(reverse('user_export'), {'type': 'ndjson', 'is_staff': 'true'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['email'] for line in lines], ['admin@example.com'])
+
+    def test_csv_export(self):
+        response = self.client.get(reverse('user_export'))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'email'])
+        self.assertEqual(len(lines), 14)
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting endpoints stay within a query budget.
+    Subclasses list budgets as `QUERY_BUDGETS = {'url_name': max_queries}`.
+    """
+
+    QUERY_BUDGETS: dict = {}
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=connection):
+        with CaptureQueriesContext(using) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(context.captured_queries, 1))
+            self.fail(f"{executed} queries executed, at most {budget} expected\n{queries}")
+
+    def assertEndpointQueries(self, url_name, call):
+        """Run `call()` and check it against the budget registered for url_name"""
+        with self.assertMaxQueries(self.QUERY_BUDGETS[url_name]):
+            return call()
@@ -0,0 +1,126 @@
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .proxies import client_address
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/10m' -> (5, 600); the period multiplier is optional, as in DRF's '5/min'"""
+    match = re.fullmatch(r'(\d+)/(\d*)([smhd])\w*', rate or '')
+    if not match:
+        raise ImproperlyConfigured(f"Invalid throttle rate {rate!r}")
+    num, multiplier, period = match.groups()
+    return int(num), int(multiplier or 1) * PERIODS[period]
+
+
+class SlidingWindowCounter:
+    """
+    Approximate sliding-window counter: the hit count of the current fixed window plus
+    the previous window's count weighted by how much of it still overlaps the sliding
+    window. On Redis the increment and the previous-window read share one pipelined
+    round-trip; other backends use their own atomic incr().
+    """
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+    def hit(self, key, limit, window):
+        """Record a hit, returns (allowed, seconds until the next hit would be allowed)"""
+        now = time.time()
+        current = int(now // window)
+        elapsed = (now % window) / window
+        count, previous = self._increment(f'{key}:{current}', f'{key}:{current - 1}', window)
+
+        if previous * (1 - elapsed) + count <= limit:
+            return True, 0
+        if count >= limit or not previous:
+            return False, window * (1 - elapsed)
+        # wait until enough of the previous window has slid out
+        needed = 1 - (limit - count) / previous
+        return False, max(0.0, (needed - elapsed) * window)
+
+    def _increment(self, current_key, previous_key, window):
+        if isinstance(self.cache, RedisCache):
+            current_key = self.cache.make_and_validate_key(current_key)
+            previous_key = self.cache.make_and_validate_key(previous_key)
+            pipeline = self.cache._cache.get_client(current_key, write=True).pipeline(transaction=False)
+            pipeline.incr(current_key)
+            pipeline.expire(current_key, window * 2)
+            pipeline.get(previous_key)
+            count, _, previous = pipeline.execute()
+            return count, int(previous or 0)
+
+        try:
+            count = self.cache.incr(current_key)
+        except ValueError:
+            # first hit in this window; add() loses to a concurrent first hit, so incr again
+            count = 1 if self.cache.add(current_key, 1, timeout=window * 2) else self.cache.incr(current_key)
+        return count, self.cache.get(previous_key, 0)
+
+
+class AccountsRateThrottle(BaseThrottle):
+    """
+    Sliding-window throttle applied separately to each identity of the request
+    (client IP and/or the email in the payload) for the view's scope. Rates come
+    from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope].
+    """
+
+    scope: str = ''
+    idents = ('ip',)
+
+    def __init__(self):
+        self.limit, self.window = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(self.scope))
+        self.counter = SlidingWindowCounter()
+        self._wait = None
+
+    def get_idents(self, request):
+        idents = []
+        if 'ip' in self.idents:
+            idents.append(f'ip:{client_address(request)}')
+        if 'email' in self.idents:
+            data = getattr(request, 'data', None) or {}
+            email = data.get('email') if hasattr(data, 'get') else None
+            if isinstance(email, str) and email.strip():
+                idents.append(f'email:{email.strip().lower()}')
+        return idents
+
+    def allow_request(self, request, view):
+        for ident in self.get_idents(request):
+            allowed, wait = self.counter.hit(f'throttle:{self.scope}:{ident}', self.limit, self.window)
+            if not allowed:
+                self._wait = wait
+                return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class LoginRateThrottle(AccountsRateThrottle):
+    scope = 'login'
+    idents = ('ip', 'email')
+
+
+class RegisterRateThrottle(AccountsRateThrottle):
+    scope = 'register'
+    idents = ('ip',)
+
+
+class OTPSendRateThrottle(AccountsRateThrottle):
+    scope = 'otp_send'
+    idents = ('ip', 'email')
+
+
+class OTPCheckRateThrottle(AccountsRateThrottle):
+    """Caps guesses against the 4-digit codes, per address and per account"""
+    scope = 'otp_check'
+    idents = ('ip', 'email')
@@ -0,0 +1,368 @@
+"""
+Two-tier cache backend: a small bounded LRU in each process (L1) in front of a shared
+cache (L2, Redis in production). Reads are served from L1 when they can be; writes go to
+L2 and are announced on an invalidation channel so other processes drop their L1 copy.
+L1 entries also expire after L1_TIMEOUT, which bounds staleness if a message is lost.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'accounts.tiered_cache.TieredCache',
+            'OPTIONS': {'L2': 'shared', 'L1_MAX_ENTRIES': 1000, 'L1_TIMEOUT': 5},
+        },
+        'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+    }
+
+With a Redis L2 the channel is Redis pub/sub. With any other L2 (locmem, for tests and
+offline development) invalidations only reach the other L1s of the same process, each
+LOCATION standing in for one worker.
+"""
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache
+
+from .metrics import CacheStats
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalStore:
+    """Bounded LRU with per-entry expiry; values are kept pickled so callers can't mutate them"""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        if timeout <= 0:
+            self.delete([key])
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, pickled)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InvalidationBus:
+    """
+    Per-process fan-out of invalidated keys to every L1 store subscribed on a channel, and,
+    when the L2 is Redis, to the other processes through pub/sub. `keys=None` means clear.
+    """
+
+    def __init__(self, l2_alias, channel):
+        self.l2_alias = l2_alias
+        self.channel = channel
+        self.stores = []
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._node = None
+
+    @property
+    def node(self):
+        # a forked worker must not mistake its parent's messages for its own
+        if self._node is None or self._node[0] != os.getpid():
+            self._node = (os.getpid(), uuid.uuid4().hex)
+        return self._node[1]
+
+    def subscribe(self, store):
+        with self._lock:
+            if store not in self.stores:
+                self.stores.append(store)
+        self._ensure_listening()
+
+    def publish(self, sender, keys):
+        self._deliver(keys, skip=sender)
+        l2 = caches[self.l2_alias]
+        if isinstance(l2, RedisCache):
+            payload = json.dumps({'node': self.node, 'keys': keys})
+            try:
+                l2._cache.get_client(write=True).publish(self.channel, payload)
+            except Exception:
+                logger.warning("Could not publish cache invalidation on %s", self.channel, exc_info=True)
+
+    def _deliver(self, keys, skip=None):
+        for store in list(self.stores):
+            if store is skip:
+                continue
+            if keys is None:
+                store.clear()
+            else:
+                store.delete(keys)
+
+    def _ensure_listening(self):
+        if self._listener_pid == os.getpid() or not isinstance(caches[self.l2_alias], RedisCache):
+            return
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                self._listener_pid = os.getpid()
+                threading.Thread(target=self._listen, name=f'cache-invalidation-{self.channel}', daemon=True).start()
+
+    def _listen(self):
+        backoff = 0.5
+        while True:
+            try:
+                pubsub = caches[self.l2_alias]._cache.get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # anything published while we weren't subscribed is lost, so start from empty L1s
+                self._deliver(None)
+                backoff = 0.5
+                for message in pubsub.listen():
+                    data = json.loads(message['data'])
+                    if data['node'] != self.node:
+                        self._deliver(data['keys'])
+            except Exception:
+                logger.warning("Cache invalidation listener on %s failed, reconnecting", self.channel, exc_info=True)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+_stores = {}
+_buses = {}
+_registry_lock = threading.Lock()
+# striped per-process locks for single-flight recomputation
+_flight_locks = [threading.Lock() for _ in range(64)]
+
+
+def _get_tiers(name, max_entries, timeout):
+    """The process-wide L1 store for a LOCATION and the hit counters of both of its tiers"""
+    with _registry_lock:
+        if name not in _stores:
+            _stores[name] = (
+                LocalStore(max_entries, timeout),
+                CacheStats(f'{name}:l1', per_request=False),
+                CacheStats(f'{name}:l2', per_request=False),
+            )
+        return _stores[name]
+
+
+def _get_bus(l2_alias, channel):
+    with _registry_lock:
+        if (l2_alias, channel) not in _buses:
+            _buses[(l2_alias, channel)] = InvalidationBus(l2_alias, channel)
+        return _buses[(l2_alias, channel)]
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend layering a process-local LRU over the cache aliased by OPTIONS['L2'].
+    Django makes one backend instance per thread; the L1 store, its hit counters and the
+    invalidation listener are shared per process, keyed by LOCATION.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location or 'default'
+        self.l2_alias = options.get('L2', 'shared')
+        self.channel = options.get('CHANNEL', 'cache-invalidation')
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.lock_poll_interval = options.get('LOCK_POLL_INTERVAL', 0.05)
+        self.l1, self.l1_stats, self.l2_stats = _get_tiers(
+            self.location, options.get('L1_MAX_ENTRIES', 1000), options.get('L1_TIMEOUT', 5),
+        )
+        self.bus = _get_bus(self.l2_alias, self.channel)
+        self.bus.subscribe(self.l1)
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _key(self, key, version):
+        return self.l2.make_and_validate_key(key, version=version)
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.l2.default_timeout
+        return None if timeout is None else max(timeout, 0)
+
+    def _invalidate(self, keys):
+        self.l1.delete(keys)
+        self.bus.publish(self.l1, keys)
+
+    def get(self, key, default=None, version=None):
+        full_key = self._key(key, version)
+        value = self.l1.get(full_key)
+        if value is not _MISSING:
+            self.l1_stats.hit()
+            return value
+        self.l1_stats.miss()
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.l2_stats.miss()
+            return default
+        self.l2_stats.hit()
+        self.l1.set(full_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remaining = {}, {}
+        for key in keys:
+            full_key = self._key(key, version)
+            value = self.l1.get(full_key)
+            if value is _MISSING:
+                remaining[key] = full_key
+            else:
+                found[key] = value
+        for _ in found:
+            self.l1_stats.hit()
+        for _ in remaining:
+            self.l1_stats.miss()
+        if remaining:
+            fetched = self.l2.get_many(list(remaining), version=version)
+            for key, full_key in remaining.items():
+                if key in fetched:
+                    self.l2_stats.hit()
+                    self.l1.set(full_key, fetched[key])
+                else:
+                    self.l2_stats.miss()
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self._key(key, version)
+        self.l2.set(key, value, timeout, version=version)
+        self._invalidate([full_key])
+        self.l1.set(full_key, value, self._l1_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        full_keys = {key: self._key(key, version) for key in data}
+        self._invalidate(list(full_keys.values()))
+        for key, value in data.items():
+            if key not in failed:
+                self.l1.set(full_keys[key], value, self._l1_timeout(timeout))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            full_key = self._key(key, version)
+            self._invalidate([full_key])
+            self.l1.set(full_key, value, self._l1_timeout(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._invalidate([self._key(key, version)])
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self.l2.delete(key, version=version)
+        self._invalidate([self._key(key, version)])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        self.l2.delete_many(keys, version=version)
+        self._invalidate([self._key(key, version) for key in keys])
+
+    def has_key(self, key, version=None):
+        return self.l1.get(self._key(key, version)) is not _MISSING or self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # counters live in L2 only, an L1 copy would be stale after the first increment
+        value = self.l2.incr(key, delta, version=version)
+        self._invalidate([self._key(key, version)])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.l2.clear()
+        self.l1.clear()
+        self.bus.publish(self.l1, None)
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Single-flight get_or_set(): on a miss only one caller computes `default`. Threads
+        of this process queue on a lock, other processes on a lock key in L2, and wait for
+        the value to appear there for up to LOCK_TIMEOUT before computing it themselves.
+        """
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        full_key = self._key(key, version)
+        with _flight_locks[hash(full_key) % len(_flight_locks)]:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+            lock_key = f'{key}:single-flight'
+            # a token of our own, so we only ever release the lock we took
+            token = uuid.uuid4().int >> 65
+            held = self.l2.add(lock_key, token, self.lock_timeout, version=version)
+            if not held:
+                deadline = time.monotonic() + self.lock_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(self.lock_poll_interval)
+                    value = self.l2.get(key, _MISSING, version=version)
+                    if value is not _MISSING:
+                        self.l1.set(full_key, value)
+                        return value
+                    if not self.l2.has_key(lock_key, version=version):
+                        held = self.l2.add(lock_key, token, self.lock_timeout, version=version)
+                        break
+            try:
+                value = default() if callable(default) else default
+                if value is not None:
+                    self.set(key, value, timeout, version=version)
+                return value
+            finally:
+                if held:
+                    self._release(lock_key, token, version)
+
+    _RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def _release(self, lock_key, token, version):
+        """Delete the lock key unless it expired and another caller holds it by now"""
+        if isinstance(self.l2, RedisCache):
+            # ints are stored unpickled (RedisSerializer), so the token compares as its digits
+            full_lock_key = self.l2.make_and_validate_key(lock_key, version=version)
+            self.l2._cache.get_client(full_lock_key, write=True).eval(self._RELEASE_SCRIPT, 1, full_lock_key, token)
+        elif self.l2.get(lock_key, version=version) == token:
+            # not atomic, which only the single-process backends used in development rely on
+            self.l2.delete(lock_key, version=version)
+
+    def stats(self):
+        """Hit ratios of both tiers in this process; L2 only sees lookups that missed L1"""
+        return {'l1': self.l1_stats.as_dict(), 'l2': self.l2_stats.as_dict(), 'l1_entries': len(self.l1)}
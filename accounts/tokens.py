@@ -0,0 +1,137 @@
+"""
+Refresh tokens whose blacklist check is answered from the cache. Each token's state is
+cached until it expires: "not blacklisted" when it is issued, "blacklisted" before the
+blacklist row is written. A missing entry (evicted, or a token issued before the cache
+was filled) is read from the database and cached again, so losing entries only costs
+queries, never lets a blacklisted token through.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from accounts.db import chunked_delete
+from accounts.metrics import CacheStats
+
+BLACKLISTED = 1
+NOT_BLACKLISTED = 0
+
+blacklist_cache_stats = CacheStats('jwt_blacklist')
+
+
+def _blacklist_key(jti):
+    return f'jwt_blacklist:{jti}'
+
+
+def _timeout(exp):
+    if exp is None:
+        return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    return max(1, int(exp - timezone.now().timestamp()))
+
+
+def get_blacklist_cache():
+    return caches[getattr(settings, 'TOKEN_BLACKLIST_CACHE_ALIAS', 'default')]
+
+
+def trusts_cached_negatives(cache=None):
+    """
+    A cached "not blacklisted" only holds when every process shares the cache, otherwise
+    another process may have blacklisted the token since. Per-process caches (locmem)
+    only answer "blacklisted"; everything else still goes to the database.
+    """
+    shared = getattr(settings, 'TOKEN_BLACKLIST_CACHE_SHARED', None)
+    if shared is None:
+        return not isinstance(cache or get_blacklist_cache(), (LocMemCache, DummyCache))
+    return shared
+
+
+def mark_blacklisted(jti, exp):
+    """Record a blacklisted JTI until the token would have expired anyway"""
+    get_blacklist_cache().set(_blacklist_key(jti), BLACKLISTED, timeout=_timeout(exp))
+
+
+def mark_outstanding(jti, exp):
+    """Record a freshly issued JTI as not blacklisted; add() never hides a blacklisting"""
+    get_blacklist_cache().add(_blacklist_key(jti), NOT_BLACKLISTED, timeout=_timeout(exp))
+
+
+def is_blacklisted(jti, exp=None):
+    cache = get_blacklist_cache()
+    state = cache.get(_blacklist_key(jti))
+    if state == BLACKLISTED or (state == NOT_BLACKLISTED and trusts_cached_negatives(cache)):
+        blacklist_cache_stats.hit()
+        return state == BLACKLISTED
+    blacklist_cache_stats.miss()
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    if blacklisted:
+        mark_blacklisted(jti, exp)
+    elif exp is not None:
+        mark_outstanding(jti, exp)
+    return blacklisted
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    RefreshToken with the blacklist check served from the cache. Outstanding token rows
+    are written with the user id from the payload instead of fetching the user first.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        mark_outstanding(token[api_settings.JTI_CLAIM], token['exp'])
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload.get('exp')):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        exp = self.payload['exp']
+        # marked first: if the insert fails the token is refused rather than let through
+        mark_blacklisted(jti, exp)
+        token, _created = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(exp),
+            },
+        )
+        try:
+            # insert without a prior read; losing the race means the token was just rotated elsewhere
+            with transaction.atomic():
+                blacklisted = BlacklistedToken.objects.create(token=token)
+        except IntegrityError:
+            raise TokenError(_("Token is blacklisted"))
+        return blacklisted
+
+    def outstand(self):
+        # only called right after set_jti(), so the row can't exist yet
+        mark_outstanding(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return OutstandingToken.objects.create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+            created_at=self.current_time,
+            token=str(self),
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
+
+
+def purgeable_tokens(now=None):
+    """Expired outstanding tokens; their blacklist rows go with them"""
+    return OutstandingToken.objects.filter(expires_at__lte=now or timezone.now())
+
+
+def purge_tokens(batch_size=1000, sleep=0.0, now=None):
+    return chunked_delete(purgeable_tokens(now), batch_size=batch_size, sleep=sleep)
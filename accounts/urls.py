@@ -17,4 +17,11 @@ urlpatterns = [
     path('change-password/', views.ChangePasswordView.as_view(), name='change_password'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('profile/update/', views.UpdateProfileView.as_view(), name='profile_update'),
+    path('profile/avatar/', views.AvatarView.as_view(), name='profile_avatar'),
+    path('profile/avatar/upload-url/', views.AvatarUploadURLView.as_view(), name='profile_avatar_upload_url'),
+    path('profile/avatar/complete/', views.AvatarUploadCompleteView.as_view(), name='profile_avatar_complete'),
+    path('users/', views.UserListView.as_view(), name='user_list'),
+    path('users/import/', views.UserImportView.as_view(), name='user_import'),
+    path('users/export/', views.UserExportView.as_view(), name='user_export'),
+    path('profile/cache-stats/', views.ProfileCacheStatsView.as_view(), name='profile_cache_stats'),
 ]
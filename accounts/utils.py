@@ -1,10 +1,12 @@
-from accounts.models import User, OTP
+from accounts.models import User
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.mail import send_mail
-from datetime import timedelta
-from django.utils import timezone
+import logging
 import random
-from typing import Optional
+from .mail import mail_queue_setting, queue_mail
+from .otp import get_otp_backend
+
+logger = logging.getLogger(__name__)
 
 def check_email_service():
     try:
@@ -14,42 +16,67 @@ def check_email_service():
     except:
         return False
 
+def generate_otp():
+    return str(random.randint(1000, 9999))
+
 def send_otp_email(user: User):
     if not check_email_service():
         return False
 
-    otp = str(random.randint(1000, 9999))
+    otp = generate_otp()
+
+    get_otp_backend().create(user, otp)
+    logger.info("Sending OTP email", extra={'user_id': str(user.pk)})
+
+    try:
+        return queue_mail(*otp_email_args(user, otp))
+    except Exception:
+        logger.exception("OTP email failed", extra={'user_id': str(user.pk)})
+        return False
 
-    OTP.objects.create(
-        user=user,
-        code=otp,
-        expires_at=timezone.now() + timedelta(minutes=10)
+def otp_email_args(user: User, otp):
+    return (
+        'Verify your email',
+        f'Your OTP for email verification is: {otp}',
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
     )
-    print(f"Sending OTP {otp} to email {user.email}")
+
+async def asend_otp_email(user: User):
+    if not check_email_service():
+        return False
+
+    otp = generate_otp()
+    await get_otp_backend().acreate(user, otp)
+    logger.info("Sending OTP email", extra={'user_id': str(user.pk)})
 
     try:
-        send_mail(
-            'Verify your email',
-            f'Your OTP for email verification is: {otp}',
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-        )
-        return True
-    except Exception as e:
-        print(f"Email sending failed: {str(e)}")
+        # enqueueing never blocks and the dispatcher thread does the SMTP work, but
+        # without the queue queue_mail() sends inline, which must stay off the event loop
+        if not mail_queue_setting('ASYNC'):
+            return await sync_to_async(queue_mail)(*otp_email_args(user, otp))
+        return queue_mail(*otp_email_args(user, otp))
+    except Exception:
+        logger.exception("OTP email failed", extra={'user_id': str(user.pk)})
         return False
 
+def send_otp_emails(users):
+    """Bulk send_otp_email: one write for all OTPs, messages go through the mail queue"""
+    if not check_email_service():
+        return 0
+
+    pairs = [(user, generate_otp()) for user in users]
+    get_otp_backend().create_many(pairs)
+    return sum(1 for user, otp in pairs if queue_mail(*otp_email_args(user, otp)))
+
 def check_otp(user, otp):
-    obj: Optional[OTP] = OTP.objects.filter(user=user, code=otp).first()
-    if obj:
-        return obj.is_valid()
-    return False
+    return get_otp_backend().check(user, otp)
 
 def use_otp(user, otp):
-    obj: Optional[OTP] = OTP.objects.filter(user=user, code=otp).first()
-    if obj:
-        if obj.is_valid():
-            obj.is_used = True
-            obj.save()
-            return True
-    return False
+    return get_otp_backend().consume(user, otp)
+
+async def acheck_otp(user, otp):
+    return await get_otp_backend().acheck(user, otp)
+
+async def ause_otp(user, otp):
+    return await get_otp_backend().aconsume(user, otp)
@@ -1,27 +1,73 @@
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.generics import GenericAPIView
+from rest_framework.generics import GenericAPIView, ListAPIView
+from django_filters.rest_framework import DjangoFilterBackend
+from django.http import StreamingHttpResponse
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from rest_framework.parsers import MultiPartParser
 from accounts.serializers import (
     CustomTokenObtainPairSerializer, 
     ResetPasswordConfirmSerializer,
     RegisterSerializer,
     UserSerializer, 
     VerifyEmailSerializer,
-    ChangePasswordSerializer
+    ChangePasswordSerializer,
+    AvatarUploadSerializer,
+    AvatarUploadURLSerializer,
+    AvatarUploadCompleteSerializer,
 )
 from rest_framework import status
+from rest_framework.exceptions import APIException
+from .activity import record_login
+from .authentication import revoke_user_tokens
+from .avatars import (
+    AvatarUploadHandler,
+    InvalidAvatar,
+    complete_direct_upload,
+    delete_avatar_files,
+    presigned_avatar_upload,
+    store_avatar,
+)
+from .filters import UserFilter
+from .pagination import KeysetPagination
+from .provisioning import import_users, read_rows
+from .throttling import LoginRateThrottle, OTPCheckRateThrottle, OTPSendRateThrottle, RegisterRateThrottle
+from .realtime import EMAIL_VERIFIED, TOKEN_BLACKLISTED, push
+from .profile_cache import etag_matches, get_cached_profile, profile_cache_stats, set_cached_profile
+from .tokens import CachedRefreshToken
 from .utils import send_otp_email, check_otp, use_otp
-from accounts.models import User
+from accounts.models import LoginEvent, User
+import csv
+import io
+import json
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0]) from e
+        except APIException:
+            record_login(request, email, None, LoginEvent.FAILED)
+            raise
+        # last_login and the audit row are written behind, see accounts.activity
+        record_login(request, email, serializer.user, LoginEvent.SUCCESS)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 
 
 class RegisterView(GenericAPIView):
     serializer_class = RegisterSerializer
+    throttle_classes = [RegisterRateThrottle]
 
     def post(self, request):
         if self.serializer_class:
@@ -37,6 +83,7 @@ class RegisterView(GenericAPIView):
 
 class VerifyEmailView(GenericAPIView):
     serializer_class = VerifyEmailSerializer
+    throttle_classes = [OTPCheckRateThrottle]
 
     def post(self, request):
         try:
@@ -45,7 +92,7 @@ class VerifyEmailView(GenericAPIView):
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             email = serializer.validated_data.get('email')
-            user= User.objects.filter(email=email).first()
+            user = User.objects.filter_by_email(email).first()
             if not user:
                 return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -56,7 +103,8 @@ class VerifyEmailView(GenericAPIView):
             otp_use = use_otp(user, input_otp)
             if otp_use:
                 user.is_active = True
-                user.save()
+                user.save(update_fields=['is_active'])
+                push(user.pk, EMAIL_VERIFIED)
                 return Response({"message": f"Email {email} successfully verified"}, status=status.HTTP_200_OK)
             else:
                 return Response({"error": "OTP is expired or already used"}, status=status.HTTP_400_BAD_REQUEST)
@@ -70,6 +118,7 @@ class VerifyEmailView(GenericAPIView):
     
 class PasswordResetConfirmView(GenericAPIView):
     serializer_class = ResetPasswordConfirmSerializer
+    throttle_classes = [OTPCheckRateThrottle]
 
     def post(self, request):
         try:
@@ -82,14 +131,15 @@ class PasswordResetConfirmView(GenericAPIView):
             input_otp = serializer.validated_data.get('otp')
             new_password = serializer.validated_data.get('new_password')
 
-            user= User.objects.filter(email=email).first()
+            user = User.objects.filter_by_email(email).first()
             if not user:
                 return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
             otp_use = use_otp(user, input_otp)
             if otp_use:
                 user.set_password(new_password)
-                user.save()
+                user.save(update_fields=['password'])
+                revoke_user_tokens(user)
                 return Response({"message": f"Password for {email} successfully reset"}, status=status.HTTP_200_OK)
             else:
                 return Response({"error": "OTP is expired or already used"}, status=status.HTTP_400_BAD_REQUEST)
@@ -101,13 +151,15 @@ class PasswordResetConfirmView(GenericAPIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class SendOTPView(GenericAPIView):
+    throttle_classes = [OTPSendRateThrottle]
+
     def post(self, request):
         email = request.data.get('email')
 
         if not email:
             return Response({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = User.objects.filter(email=email).first()
+        user = User.objects.filter_by_email(email).first()
         if not user:
             return Response({"error": "User with this email does not exist"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -117,6 +169,8 @@ class SendOTPView(GenericAPIView):
         return Response({"error": "Failed to send OTP"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CheckOTPView(GenericAPIView):
+    throttle_classes = [OTPCheckRateThrottle]
+
     def post(self, request):
         email = request.data.get('email')
         otp = request.data.get('otp')
@@ -124,7 +178,7 @@ class CheckOTPView(GenericAPIView):
         if not email or not otp:
             return Response({"error": "Email and OTP are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = User.objects.filter(email=email).first()
+        user = User.objects.filter_by_email(email).first()
         if not user:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -137,11 +191,18 @@ class ProfileView(GenericAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        user = request.user
-        if self.serializer_class:
-            serializer = self.serializer_class(user)
+        profile = get_cached_profile(request.user, self.serializer_class)
+        etag = profile['etag']
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(profile['data'], status=status.HTTP_200_OK, headers={'ETag': etag})
+
+class ProfileCacheStatsView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(profile_cache_stats.as_dict(), status=status.HTTP_200_OK)
 
 class UpdateProfileView(GenericAPIView):
     serializer_class = UserSerializer
@@ -153,10 +214,75 @@ class UpdateProfileView(GenericAPIView):
             serializer = self.serializer_class(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            profile = set_cached_profile(user.pk, serializer.data)
+            return Response(profile['data'], status=status.HTTP_200_OK, headers={'ETag': profile['etag']})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AvatarView(GenericAPIView):
+    serializer_class = AvatarUploadSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        # must be installed before the body is parsed; spools to disk, never into memory
+        limit = AvatarUploadHandler(request._request)
+        request._request.upload_handlers = [limit, TemporaryFileUploadHandler(request._request)]
+        serializer = self.get_serializer(data=request.data)
+        if limit.exceeded:
+            return Response({"error": f"Avatar must be at most {limit.max_size} bytes"},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            store_avatar(request.user, serializer.validated_data['avatar'])
+        except InvalidAvatar as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # thumbnails follow once the worker has rendered them
+        return Response(UserSerializer(request.user).data, status=status.HTTP_202_ACCEPTED)
+
+    def delete(self, request):
+        user = request.user
+        name, thumbnails = user.avatar.name, user.avatar_thumbnails
+        if name:
+            user.avatar = None
+            user.avatar_thumbnails = {}
+            user.save(update_fields=['avatar', 'avatar_thumbnails'])
+            transaction.on_commit(lambda: delete_avatar_files(name, thumbnails))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AvatarUploadURLView(GenericAPIView):
+    serializer_class = AvatarUploadURLSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        upload = presigned_avatar_upload(request.user, serializer.validated_data['content_type'])
+        if upload is None:
+            return Response({"error": "Direct uploads need S3-compatible avatar storage"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(upload, status=status.HTTP_200_OK)
+
+
+class AvatarUploadCompleteView(GenericAPIView):
+    serializer_class = AvatarUploadCompleteSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            complete_direct_upload(request.user, serializer.validated_data['name'])
+        except InvalidAvatar as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UserSerializer(request.user).data, status=status.HTTP_202_ACCEPTED)
+
+
 class ChangePasswordView(GenericAPIView):
     serializer_class = ChangePasswordSerializer
     permission_classes = [IsAuthenticated]
@@ -172,7 +298,8 @@ class ChangePasswordView(GenericAPIView):
                 return Response({"error": "Old password is incorrect"}, status=status.HTTP_400_BAD_REQUEST)
 
             user.set_password(serializer.validated_data.get('new_password'))
-            user.save()
+            user.save(update_fields=['password'])
+            revoke_user_tokens(user)
             return Response({"message": "Password changed successfully"}, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -190,8 +317,9 @@ class LogoutView(GenericAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()
+            push(request.user.pk, TOKEN_BLACKLISTED, jti=token[api_settings.JTI_CLAIM])
             
             return Response(
                 {"message": "Successfully logged out"},
@@ -202,3 +330,80 @@ class LogoutView(GenericAPIView):
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class UserListView(ListAPIView):
+    serializer_class = UserSerializer
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = UserFilter
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return UserSerializer.optimize_queryset(User.objects.all())
+
+
+class UserImportView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"error": "A CSV or JSONL file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('type') or ('jsonl' if upload.name.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if fmt not in ('csv', 'jsonl'):
+            return Response({"error": "type must be csv or jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = import_users(
+                read_rows(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), fmt),
+                processes=False,
+                is_active=str(request.data.get('is_active', 'true')).lower() == 'true',
+                send_otp=str(request.data.get('send_otp', 'false')).lower() == 'true',
+            )
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Could not read file: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class _Echo:
+    """File-like object that hands back what csv.writer writes to it"""
+    def write(self, value):
+        return value
+
+
+class UserExportView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = UserFilter
+    export_fields = ['id', 'email', 'full_name', 'phone_number', 'is_active', 'is_staff', 'joined_at', 'last_login']
+    chunk_size = 2000
+
+    def get_queryset(self):
+        return User.objects.order_by('-joined_at', '-id')
+
+    def get(self, request):
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in ('csv', 'ndjson'):
+            return Response({"error": "type must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = self.filter_queryset(self.get_queryset()).values_list(*self.export_fields).iterator(
+            chunk_size=self.chunk_size
+        )
+        if export_type == 'csv':
+            writer = csv.writer(_Echo())
+            content = (writer.writerow(row) for row in _with_header(self.export_fields, rows))
+            content_type = 'text/csv'
+        else:
+            content = (json.dumps(dict(zip(self.export_fields, row)), default=str) + '\n' for row in rows)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="users.{export_type}"'
+        return response
+
+
+def _with_header(header, rows):
+    yield header
+    yield from rows
@@ -12,5 +12,17 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_name.settings')
+# picks the ASGI database connection sizing in settings
+os.environ.setdefault('DJANGO_SERVER_INTERFACE', 'asgi')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported once Django is set up, the consumers use the ORM
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from accounts.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_application,
+    'websocket': URLRouter(websocket_urlpatterns),
+})
@@ -12,9 +12,17 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
-from dotenv import load_dotenv
-load_dotenv()
+
+# Deployments that pass configuration through the environment can set DJANGO_READ_DOT_ENV=false
+# to skip importing python-dotenv and searching for a .env file on every start-up.
+if os.getenv('DJANGO_READ_DOT_ENV', 'true').lower() == 'true':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+# `manage.py test`: background writers are switched off so tests stay inside their transactions
+TESTING = sys.argv[1:2] == ['test']
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,16 +56,20 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
+    'django_filters',
 ]
 
 MIDDLEWARE = [
+    'accounts.metrics.MetricsMiddleware',
+    'accounts.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'accounts.sessions.RouteAwareSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.routers.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'project_name.urls'
@@ -83,17 +95,115 @@ WSGI_APPLICATION = 'project_name.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite unless DB_ENGINE=postgresql. wsgi.py and asgi.py set DJANGO_SERVER_INTERFACE so each
+# server type gets its own connection sizing: WSGI workers keep persistent connections, ASGI
+# (where connections are per thread and short-lived) defaults to none and should use the pool.
+SERVER_INTERFACE = os.getenv('DJANGO_SERVER_INTERFACE', 'wsgi')
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600' if SERVER_INTERFACE == 'wsgi' else '0'))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'project_name'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # reused connections are pinged before the first query of a request
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            },
+        }
+    }
+    # In-process pool (Django's built-in one, needs psycopg 3 installed as psycopg[pool]).
+    # Size it per process: WSGI needs one connection per worker thread, ASGI one per
+    # concurrently running sync_to_async / async ORM call.
+    if os.getenv('DB_POOL', 'false').lower() == 'true':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv(
+                f'DB_POOL_MAX_SIZE_{SERVER_INTERFACE.upper()}',
+                '4' if SERVER_INTERFACE == 'wsgi' else '20',
+            )),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                # wait for the writer instead of failing with "database is locked"
+                'timeout': 20,
+                # take the write lock up front so read-then-write transactions can't deadlock
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets readers run alongside the writer; NORMAL sync is durable in WAL mode
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728'
+                ),
+            },
+        }
     }
+
+# Read replicas for the accounts models (accounts.routers): DB_REPLICA_HOSTS for PostgreSQL,
+# or SQLITE_REPLICAS file paths kept in step with `manage.py sync_sqlite_replicas` locally.
+if DB_ENGINE == 'postgresql':
+    _replicas = [{'HOST': host.strip()} for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+else:
+    _replicas = [{'NAME': path.strip()} for path in os.getenv('SQLITE_REPLICAS', '').split(',') if path.strip()]
+for _i, _replica in enumerate(_replicas):
+    DATABASES[f'replica_{_i}'] = {**DATABASES['default'], **_replica, 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['accounts.routers.ReplicaRouter']
+
+# Replica lag limit and read-your-writes window, in seconds
+REPLICA_ROUTING = {
+    'MAX_LAG': float(os.getenv('REPLICA_MAX_LAG', '5')),
+    'LAG_CHECK_INTERVAL': 5.0,
+    'STICKY_SECONDS': int(os.getenv('REPLICA_STICKY_SECONDS', '10')),
 }
 
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
+# Password hashing
+# PASSWORD_HASHER picks the algorithm new hashes use: pbkdf2_sha256, scrypt or argon2 (needs argon2-cffi).
+# Hashes made with any other listed hasher still verify and are upgraded on the next successful login.
+# Pick costs with `python manage.py calibrate_hashers`.
+PASSWORD_HASHING = {
+    'ALGORITHM': os.getenv('PASSWORD_HASHER', 'pbkdf2_sha256'),
+    'PBKDF2_ITERATIONS': int(os.getenv('PBKDF2_ITERATIONS', '1000000')),
+    'SCRYPT_WORK_FACTOR': int(os.getenv('SCRYPT_WORK_FACTOR', str(2 ** 14))),
+    'ARGON2_TIME_COST': int(os.getenv('ARGON2_TIME_COST', '2')),
+    'ARGON2_MEMORY_COST': int(os.getenv('ARGON2_MEMORY_COST', '102400')),
+    'ARGON2_PARALLELISM': int(os.getenv('ARGON2_PARALLELISM', '8')),
+    # threads hashing at once per process, defaults to the CPU count
+    'WORKERS': int(os.getenv('PASSWORD_HASH_WORKERS', '0')) or None,
+}
+
+_PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'accounts.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHING['ALGORITHM']]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHING['ALGORITHM']
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -131,13 +241,104 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded files live on the local filesystem unless AWS_STORAGE_BUCKET_NAME names an
+# S3-compatible bucket (credentials come from the usual AWS_* environment variables)
+if os.getenv('AWS_STORAGE_BUCKET_NAME'):
+    _media_storage = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': os.getenv('AWS_STORAGE_BUCKET_NAME'),
+            'endpoint_url': os.getenv('AWS_S3_ENDPOINT_URL'),
+            'region_name': os.getenv('AWS_S3_REGION_NAME'),
+            'custom_domain': os.getenv('AWS_S3_CUSTOM_DOMAIN'),
+            'file_overwrite': False,
+        },
+    }
+else:
+    _media_storage = {'BACKEND': 'django.core.files.storage.FileSystemStorage'}
+STORAGES = {
+    'default': _media_storage,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Addresses of the reverse proxies in front of the app (accounts.proxies). Only the
+# X-Forwarded-For hops they append are trusted; throttling, login activity, replica pinning
+# and the /metrics allowlist key on that address, so leaving this empty behind a proxy makes
+# every client look like the proxy, and listing an untrusted hop lets clients pick their own.
+TRUSTED_PROXIES = tuple(filter(None, os.getenv('TRUSTED_PROXIES', '').split(',')))
+
+# Request metrics (accounts.metrics), scraped from /metrics with METRICS_TOKEN as bearer token,
+# or from ALLOWED_IPS when no token is set; behind a proxy ALLOWED_IPS is matched against
+# the forwarded address (see TRUSTED_PROXIES).
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+    'SERVER_TIMING': os.getenv('METRICS_SERVER_TIMING', 'true').lower() == 'true',
+    'TOKEN': os.getenv('METRICS_TOKEN'),
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
+# Structured logs: LOG_FORMAT=json emits one JSON object per line
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'accounts.logs.JSONFormatter'},
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': os.getenv('LOG_FORMAT', 'plain')},
+    },
+    'root': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO')},
+    'loggers': {
+        # one line per request at DEBUG
+        'accounts.requests': {'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING')},
+    },
+}
+
+# Avatar uploads and thumbnails (accounts.avatars)
+AVATARS = {
+    'STORAGE': 'default',
+    'MAX_UPLOAD_SIZE': int(os.getenv('AVATAR_MAX_UPLOAD_SIZE', 5 * 1024 * 1024)),
+    'SIZES': (64, 256),
+    'FORMATS': ('webp', 'jpeg'),
+    'ASYNC': os.getenv('AVATAR_ASYNC', 'true').lower() == 'true',
+    'WORKERS': 2,
+}
+
+# Response compression and compressed request bodies (accounts.compression)
+COMPRESSION = {
+    'ENABLED': os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true',
+    'ENCODINGS': ('zstd', 'br', 'gzip'),
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', 1024)),
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'accounts.authentication.JWTClaimsAuthentication',
+        'accounts.authentication.RouteAwareSessionAuthentication',
+    ),
+    # JSON stays the default; mobile clients ask for msgpack with Accept/Content-Type
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+        'accounts.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'accounts.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
+    # sliding-window limits per client IP and per email (accounts.throttling); the
+    # THROTTLE_RATE_* variables let load tests against a local server lift them
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('THROTTLE_RATE_LOGIN', '10/m'),
+        'register': os.getenv('THROTTLE_RATE_REGISTER', '20/h'),
+        'otp_send': os.getenv('THROTTLE_RATE_OTP_SEND', '5/10m'),
+        'otp_check': os.getenv('THROTTLE_RATE_OTP_CHECK', '10/10m'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -145,11 +346,77 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CachedTokenRefreshSerializer',
+    # last_login is batched by accounts.activity instead of one UPDATE per login
+    'UPDATE_LAST_LOGIN': False,
 }
 
+# Caches. With REDIS_URL the default cache is a small per-process L1 in front of Redis, kept
+# coherent over pub/sub (accounts.tiered_cache); without it every process has its own locmem.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'accounts.tiered_cache.TieredCache',
+            'OPTIONS': {
+                'L2': 'shared',
+                'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', 1000)),
+                # upper bound on how stale an L1 entry can get if an invalidation is lost
+                'L1_TIMEOUT': float(os.getenv('CACHE_L1_TIMEOUT', 5)),
+            },
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'project_name'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    }
+# Counters, one-time codes and the token blacklist skip the L1 and go straight to the shared tier
+SHARED_CACHE_ALIAS = 'shared' if REDIS_URL else 'default'
+THROTTLE_CACHE_ALIAS = SHARED_CACHE_ALIAS
+OTP_CACHE_ALIAS = SHARED_CACHE_ALIAS
+
+# Account events pushed to WebSocket clients (accounts.realtime, served by asgi.py). Redis
+# pub/sub fans a group message out once per server; the in-memory layer only reaches
+# consumers in the same process, which is enough for tests and a single dev server.
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    }
+REALTIME = {
+    'ENABLED': os.getenv('REALTIME_ENABLED', 'true').lower() == 'true',
+}
+
+# Sessions are for the admin; paths under JWT_ONLY_PATHS get none, so a browsable API that
+# logs in with a session must live outside them (accounts.sessions). SESSION_ENGINE is db,
+# cached_db, cache or signed_cookies; expired rows of the database engines are removed with
+# `manage.py purge_sessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.getenv('SESSION_ENGINE', 'cached_db')
+SESSION_CACHE_ALIAS = SHARED_CACHE_ALIAS
+SESSIONS = {
+    'JWT_ONLY_PATHS': tuple(os.getenv('SESSION_JWT_ONLY_PATHS', '/api/').split(',')),
+}
+
+# The blacklist state of each refresh-token JTI is cached here (accounts.tokens). A cached
+# "not blacklisted" is only trusted on a cache shared by all processes; None decides from
+# the backend.
+TOKEN_BLACKLIST_CACHE_ALIAS = SHARED_CACHE_ALIAS
+TOKEN_BLACKLIST_CACHE_SHARED = None
+
 AUTH_USER_MODEL = 'accounts.User'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -157,6 +424,36 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 
+# Outbound mail is queued and sent in batches by a background dispatcher (accounts.mail)
+MAIL_QUEUE = {
+    'ASYNC': os.getenv('MAIL_QUEUE_ASYNC', 'true').lower() == 'true',
+    'BATCH_SIZE': 50,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 1.0,
+}
+
+# Login events and last_login are buffered per process and written in batches (accounts.activity)
+LOGIN_ACTIVITY = {
+    'ENABLED': os.getenv('LOGIN_ACTIVITY_ENABLED', 'true').lower() == 'true',
+    'ASYNC': os.getenv('LOGIN_ACTIVITY_ASYNC', 'false' if TESTING else 'true').lower() == 'true',
+    'BATCH_SIZE': int(os.getenv('LOGIN_ACTIVITY_BATCH_SIZE', '500')),
+    'FLUSH_INTERVAL': float(os.getenv('LOGIN_ACTIVITY_FLUSH_INTERVAL', '2')),
+    'MAX_BUFFER_SIZE': int(os.getenv('LOGIN_ACTIVITY_MAX_BUFFER_SIZE', '10000')),
+}
+
+
+# OTP storage: 'accounts.otp.DatabaseOTPBackend' or 'accounts.otp.CacheOTPBackend'
+OTP_BACKEND = os.getenv('OTP_BACKEND', 'accounts.otp.DatabaseOTPBackend')
+OTP_LIFETIME = timedelta(minutes=10)
+# Seconds between in-process purges of used/expired OTPs, unset to rely on `manage.py purge_otps`
+OTP_PURGE_INTERVAL = int(os.getenv('OTP_PURGE_INTERVAL', '0')) or None
+OTP_PURGE_BATCH_SIZE = 1000
+
+# Seconds a serialized profile stays in the cache (invalidated on every User save)
+PROFILE_CACHE_TIMEOUT = 300
+
+# Rows per bulk_create batch for `manage.py import_users` and the users/import/ endpoint
+USER_IMPORT_BATCH_SIZE = 500
 
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True
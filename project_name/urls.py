@@ -17,7 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from accounts.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/accounts/', include('accounts.urls')),
+    path('api/async/accounts/', include(('accounts.async_urls', 'async_accounts'))),
 ]
@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_name.settings')
+# picks the WSGI database connection sizing in settings
+os.environ.setdefault('DJANGO_SERVER_INTERFACE', 'wsgi')
 
 application = get_wsgi_application()
@@ -0,0 +1,16 @@
+"""
+WSGI entry point for servers that load the application once and fork workers from it,
+e.g. `gunicorn project_name.wsgi_preload:application --preload`.
+
+Importing this module does what the first request of every worker would otherwise do:
+the URLconf and view modules, serializer fields, hashers and a database round trip (the
+connection is closed again before the fork). Then gc.freeze() keeps the collector from
+touching the loaded objects, so workers keep sharing those pages copy-on-write. Threads
+started while loading, such as the OTP purge scheduler, only run in the parent process.
+"""
+
+from project_name.wsgi import application  # noqa: F401
+
+from accounts.startup import warm_up
+
+warm_up(freeze=True)